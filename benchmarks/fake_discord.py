@@ -0,0 +1,188 @@
+"""
+A local stand-in for the parts of Discord's OAuth & API used by the app, so it can be load tested
+without a Discord application or rate limits.
+
+Point the app at it with SB_DISCORD_API_BASE_URL, e.g. to run it on its own:
+    python -m benchmarks.fake_discord --port 8090 --server 571785546213621790
+    SB_DISCORD_API_BASE_URL=http://localhost:8090 flask run --port 8080
+
+Users are identified by their snowflake, which is used as the OAuth code and in the access token:
+    GET  /oauth2/authorize   redirects straight back to redirect_uri, logging in the snowflake in the
+                             X-Fake-Snowflake header (or the next unused snowflake).
+    POST /oauth2/token       exchanges the code for the access token 'fake-<snowflake>'.
+    GET  /users/@me          the user of the bearer token.
+    GET  /users/@me/guilds   every user is in the configured server, unless their snowflake is in outsiders.
+    GET  /*                  any other request gets 200, so it can stand in for the frontend too.
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+# First snowflake handed out to users logging in without an X-Fake-Snowflake header.
+FIRST_SNOWFLAKE = 10 ** 17
+
+class FakeDiscordHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # don't write a line per request.
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def snowflake_from_token(self):
+        """
+        Returns:
+            (str) snowflake of the bearer token, or None if there isn't a valid one.
+        """
+        authorization = self.headers.get("Authorization", "")
+        token = authorization.removeprefix("Bearer ").strip()
+        if not token.startswith("fake-"):
+            return None
+        return token.removeprefix("fake-")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.removeprefix(self.server.prefix)
+        self.server.record(path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if path == "/oauth2/authorize":
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            snowflake = self.headers.get("X-Fake-Snowflake") or self.server.next_snowflake()
+            location = f"{query['redirect_uri']}?{urlencode({'code': snowflake, 'state': query.get('state', '')})}"
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if path in ("/users/@me", "/users/@me/guilds"):
+            snowflake = self.snowflake_from_token()
+            if snowflake is None:
+                self.send_json(401, {"message": "401: Unauthorized", "code": 0})
+            elif path == "/users/@me":
+                self.send_json(200, self.server.user(snowflake))
+            else:
+                self.send_json(200, self.server.guilds(snowflake))
+            return
+
+        self.send_json(200, {"status": "ok", "path": path})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path.removeprefix(self.server.prefix)
+        self.server.record(path)
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if path == "/oauth2/token" and form.get("code"):
+            self.send_json(200, {
+                "access_token": f"fake-{form['code']}",
+                "refresh_token": f"fake-refresh-{form['code']}",
+                "token_type": "Bearer",
+                "expires_in": 604800,
+                "scope": "identify guilds"
+            })
+            return
+
+        if path == "/oauth2/token/revoke":
+            self.send_json(200, {})
+            return
+
+        self.send_json(404, {"message": "404: Not Found", "code": 0})
+
+class FakeDiscord(ThreadingHTTPServer):
+    """
+    Fake discord server, run in a background thread with start() or on its own with serve_forever().
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, server=0, outsiders=(), latency=0.0, prefix=""):
+        """
+        :param host: address to listen on.
+        :param port: port to listen on, 0 picks a free port.
+        :param server: snowflake of the discord server every user is a member of.
+        :param outsiders: snowflakes of users who aren't members of the server.
+        :param latency: seconds added to every response, to simulate the real API.
+        :param prefix: path the API is served under e.g. '/api'.
+        """
+        super().__init__((host, port), FakeDiscordHandler)
+        self.server_snowflake = str(server)
+        self.outsiders = {str(snowflake) for snowflake in outsiders}
+        self.latency = latency
+        self.prefix = prefix.rstrip("/")
+        self.snowflakes = itertools.count(FIRST_SNOWFLAKE)
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{self.prefix}"
+
+    def next_snowflake(self) -> str:
+        with self.lock:
+            return str(next(self.snowflakes))
+
+    def record(self, path):
+        with self.lock:
+            self.requests[path] += 1
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            (dict) amount of requests made to each path.
+        """
+        with self.lock:
+            return dict(self.requests)
+
+    def user(self, snowflake) -> dict:
+        return {
+            "id": snowflake,
+            "username": f"user_{snowflake[-6:]}",
+            "discriminator": "0",
+            "avatar": None,
+        }
+
+    def guilds(self, snowflake) -> list:
+        if snowflake in self.outsiders:
+            return []
+        return [{"id": self.server_snowflake, "name": "Skrapbuk", "icon": None, "owner": False, "permissions": 0}]
+
+    def start(self):
+        """
+        Serve requests from a background thread.
+        Returns:
+            (FakeDiscord) this server.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--server", default="571785546213621790", help="snowflake of the discord server.")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response.")
+    args = parser.parse_args()
+
+    fake_discord = FakeDiscord(args.host, args.port, args.server, latency=args.latency)
+    print(f"Fake discord api running on {fake_discord.url}")
+    fake_discord.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""
+End-to-end load test of the app against a fake discord server (benchmarks/fake_discord.py), reporting
+latency percentiles & throughput of each endpoint.
+
+The app is started in a separate process on a temporary sqlite database, upload folder & copy of config.yml,
+so nothing in the repository is changed. Scenarios run in order, each building on the last:
+    signup    every user logs in, POSTs /users/answers then GETs /users/join, all at once.
+    start     an admin GETs /event/start, pairing every user, then /event/pairs.
+    partner   reveal day, every user polls /users/partner.
+    upload    every user uploads artwork to /users/upload at the same time.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --users 200 --concurrency 20
+    python -m benchmarks.load_test --save-baseline default
+    python -m benchmarks.load_test --compare default
+    python -m benchmarks.load_test --server gevent --discord-latency 0.2
+    python -m benchmarks.load_test --server gunicorn --workers 4
+
+Baselines are saved to benchmarks/baselines/<name>.json, comparing against one exits with status 1 when an
+endpoint's p95 latency or throughput is worse than the baseline by more than --tolerance. Baselines are only
+comparable when taken on the same machine with the same settings.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import yaml
+
+from benchmarks.fake_discord import FakeDiscord, FIRST_SNOWFLAKE
+from benchmarks.serve import SERVERS
+
+SCENARIOS = ["signup", "start", "partner", "upload"]
+BASELINE_FOLDER = os.path.join(os.path.dirname(__file__), "baselines")
+# Snowflake of the admin who starts the event, users are numbered from FIRST_SNOWFLAKE.
+ADMIN_SNOWFLAKE = str(FIRST_SNOWFLAKE - 1)
+SERVER_SNOWFLAKE = "571785546213621790"
+PERCENTILES = (50, 90, 95, 99)
+# Token the load test reads the app's /metrics with.
+METRICS_TOKEN = "load-test"
+# p95 latencies within this many ms of the baseline aren't regressions, as single requests vary this much.
+LATENCY_SLACK_MS = 5
+
+ANSWERS = {
+    "game": "Minecraft",
+    "colour": "Green",
+    "song": "Last Christmas",
+    "film": "Elf",
+    "food": "Mince pies",
+    "hobby": "Drawing"
+}
+
+def percentile(values, percent) -> float:
+    """
+    Get a percentile of sorted values, using the nearest rank.
+    :param values: sorted list of values.
+    :param percent: percentile between 0 and 100.
+    Returns:
+        (float) the value at that percentile.
+    """
+    if not values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+class Recorder:
+    """
+    Collect the latency & status of every request made in a scenario, grouped by endpoint.
+    """
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def request(self, endpoint, send, expected=(200,)):
+        """
+        Time a request.
+        :param endpoint: name the request is reported under e.g. 'POST /users/answers'.
+        :param send: function sending the request, returning its response.
+        :param expected: status codes counted as a success.
+        Returns:
+            (Response) the response.
+        """
+        start = time.perf_counter()
+        try:
+            response = send()
+            failed = response.status_code not in expected
+        except requests.RequestException:
+            response, failed = None, True
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            if failed:
+                self.errors[endpoint] += 1
+        return response
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def results(self) -> dict:
+        """
+        Returns:
+            (dict) request count, errors, throughput & latency percentiles (ms) of each endpoint.
+        """
+        duration = (self.finished or time.perf_counter()) - self.started
+        results = {}
+        for endpoint, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            result = {
+                "requests": len(latencies),
+                "errors": self.errors[endpoint],
+                "throughput": round(len(latencies) / duration, 2) if duration else 0.0,
+                "mean": round(sum(latencies) / len(latencies) * 1000, 2),
+            }
+            for percent in PERCENTILES:
+                result[f"p{percent}"] = round(percentile(latencies, percent) * 1000, 2)
+            result["max"] = round(latencies[-1] * 1000, 2)
+            results[endpoint] = result
+        return results
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def write_config(path, thumbnail_workers):
+    """
+    Copy config.yml for the load test, with the fake discord server & benchmark admin.
+    :param path: where to write the config.
+    :param thumbnail_workers: amount of thumbnail processes.
+    """
+    with open(os.path.join("python", "config.yml"), "r") as file:
+        settings = yaml.safe_load(file)
+
+    settings["discord"] = {
+        "server": int(SERVER_SNOWFLAKE),
+        "admins": {"benchmark": int(ADMIN_SNOWFLAKE)},
+        "start_time": int(time.time()) - 60,
+    }
+    settings.setdefault("thumbnails", {})["workers"] = thumbnail_workers
+    settings.pop("database", None)
+
+    with open(path, "w") as file:
+        yaml.dump(settings, file)
+
+def start_app(workdir, fake_discord, server, workers):
+    """
+    Start the app in a separate process & wait until it's accepting requests.
+    :param workdir: temporary folder for the database, uploads, config & log.
+    :param fake_discord: the running FakeDiscord server.
+    :param server: 'werkzeug' for a thread per request, 'gevent' for the async mode or 'gunicorn'.
+    :param workers: amount of gunicorn worker processes.
+    Returns:
+        (tuple) the app process, its base url & log file.
+    """
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    environment = dict(
+        os.environ,
+        SB_CLIENT_ID="1",
+        SB_CLIENT_SECRET="benchmark",
+        SB_DISCORD_API_BASE_URL=fake_discord.url,
+        SB_DISCORD_REDIRECT_URI=f"{base_url}/callback/",
+        SB_FRONTEND_BASE_URL=f"{fake_discord.url}/frontend",
+        SB_DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'skrapbuk.db')}",
+        SB_CONFIG_PATH=os.path.join(workdir, "config.yml"),
+        SB_UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+        SB_METRICS_TOKEN=METRICS_TOKEN,
+        SB_SECRET_KEY="load-test",
+        # every worker appends to the same log.
+        SB_LOG_FILE=os.path.join(workdir, "app.log"),
+    )
+    log = open(os.path.join(workdir, "app.log"), "a")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.serve", str(port), server, str(workers)],
+        env=environment, stdout=log, stderr=subprocess.STDOUT
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The app exited on startup, see {log.name}")
+        try:
+            requests.get(f"{base_url}/event/countdown", timeout=1)
+            return process, base_url, log
+        except requests.ConnectionError:
+            time.sleep(0.1)
+
+    process.terminate()
+    raise RuntimeError(f"The app didn't start within 30 seconds, see {log.name}")
+
+def statements_per_request(base_url) -> dict:
+    """
+    Read the average SQL statements made by a request to each endpoint from the app's /metrics.
+    :param base_url: base url of the app.
+    Returns:
+        (dict) average statements per request of each endpoint.
+    """
+    response = requests.get(f"{base_url}/metrics", headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+    totals = defaultdict(dict)
+    for line in response.text.splitlines():
+        for suffix in ("_sum", "_count"):
+            prefix = f"skrapbuk_request_sql_statements{suffix}{{endpoint=\""
+            if line.startswith(prefix):
+                endpoint, value = line[len(prefix):].split("\"} ")
+                totals[endpoint][suffix] = float(value)
+
+    return {endpoint: round(total["_sum"] / total["_count"], 2)
+            for endpoint, total in sorted(totals.items()) if total.get("_count")}
+
+def login(base_url, snowflake, recorder):
+    """
+    Log a user in through the fake discord OAuth flow.
+    :param base_url: base url of the app.
+    :param snowflake: snowflake of the user.
+    :param recorder: Recorder timing the login.
+    Returns:
+        (Session) a requests session with the user's session cookie.
+    """
+    client = requests.Session()
+    client.headers["X-Fake-Snowflake"] = snowflake
+    recorder.request("GET / (login)", lambda: client.get(f"{base_url}/"))
+    return client
+
+def run_all(concurrency, users, task):
+    """
+    Run a task for every user, concurrency at a time.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(task, users))
+
+def scenario_signup(context, recorder):
+    base_url = context["base_url"]
+
+    def sign_up(snowflake):
+        client = login(base_url, snowflake, recorder)
+        recorder.request("POST /users/answers", lambda: client.post(f"{base_url}/users/answers", json=ANSWERS))
+        recorder.request("GET /users/join", lambda: client.get(f"{base_url}/users/join"))
+        context["clients"][snowflake] = client
+
+    run_all(context["concurrency"], context["snowflakes"], sign_up)
+
+def scenario_start(context, recorder):
+    base_url = context["base_url"]
+    admin = login(base_url, ADMIN_SNOWFLAKE, recorder)
+    recorder.request("GET /event/start", lambda: admin.get(f"{base_url}/event/start"))
+    recorder.request("GET /event/pairs", lambda: admin.get(f"{base_url}/event/pairs"))
+
+def scenario_partner(context, recorder):
+    base_url = context["base_url"]
+
+    def poll(snowflake):
+        client = context["clients"][snowflake]
+        for _ in range(context["polls"]):
+            recorder.request("GET /users/partner", lambda: client.get(f"{base_url}/users/partner"))
+
+    run_all(context["concurrency"], context["snowflakes"], poll)
+
+def scenario_upload(context, recorder):
+    base_url = context["base_url"]
+    artwork = os.urandom(context["upload_size"])
+
+    def upload(snowflake):
+        client = context["clients"][snowflake]
+        recorder.request("POST /users/upload", lambda: client.post(
+            f"{base_url}/users/upload", files={"image": ("artwork.mp3", artwork, "audio/mpeg")}
+        ))
+
+    run_all(context["concurrency"], context["snowflakes"], upload)
+
+SCENARIO_FUNCTIONS = {
+    "signup": scenario_signup,
+    "start": scenario_start,
+    "partner": scenario_partner,
+    "upload": scenario_upload,
+}
+
+def run(args):
+    """
+    Run the selected scenarios, every scenario before the last selected one runs too as later scenarios
+    depend on them, but only the selected ones are reported.
+    Returns:
+        (dict) results of each selected scenario.
+    """
+    last = max(SCENARIOS.index(name) for name in args.scenarios)
+    workdir = tempfile.mkdtemp(prefix="skrapbuk-load-test-")
+    write_config(os.path.join(workdir, "config.yml"), args.thumbnail_workers)
+
+    fake_discord = FakeDiscord(server=SERVER_SNOWFLAKE, latency=args.discord_latency).start()
+    process, base_url, log = start_app(workdir, fake_discord, args.server, args.workers)
+
+    context = {
+        "base_url": base_url,
+        "concurrency": args.concurrency,
+        "snowflakes": [str(FIRST_SNOWFLAKE + i) for i in range(args.users)],
+        "clients": {},
+        "polls": args.polls,
+        "upload_size": args.upload_size,
+    }
+
+    results = {}
+    try:
+        for name in SCENARIOS[:last + 1]:
+            recorder = Recorder()
+            SCENARIO_FUNCTIONS[name](context, recorder)
+            recorder.finish()
+            if name in args.scenarios:
+                results[name] = recorder.results()
+        results["sql statements per request"] = statements_per_request(base_url)
+    finally:
+        # close keep-alive connections, which gunicorn waits for when shutting down.
+        for client in context["clients"].values():
+            client.close()
+        process.terminate()
+        process.wait(timeout=30)
+        log.close()
+        fake_discord.shutdown()
+        if args.keep:
+            print(f"Kept the load test's database, uploads & log in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results["discord api requests"] = fake_discord.stats()
+    return results
+
+def print_results(results):
+    columns = ["requests", "errors", "throughput", "mean"] + [f"p{p}" for p in PERCENTILES] + ["max"]
+    print(f"{'endpoint':<24}" + "".join(f"{column:>11}" for column in columns))
+    for scenario in SCENARIOS:
+        if scenario not in results:
+            continue
+        print(f"[{scenario}]")
+        for endpoint, result in results[scenario].items():
+            print(f"{endpoint:<24}" + "".join(f"{result[column]:>11}" for column in columns))
+    print("(throughput in requests/s, latencies in ms)")
+    print(f"sql statements per request: {results.get('sql statements per request', {})}")
+    print(f"discord api requests: {results.get('discord api requests', {})}")
+
+def baseline_path(name) -> str:
+    return os.path.join(BASELINE_FOLDER, f"{name}.json")
+
+def save_baseline(name, settings, results):
+    os.makedirs(BASELINE_FOLDER, exist_ok=True)
+    with open(baseline_path(name), "w") as file:
+        json.dump({"settings": settings, "results": results}, file, indent=2)
+        file.write("\n")
+    print(f"Saved baseline to {baseline_path(name)}")
+
+def compare(name, settings, results, tolerance) -> list:
+    """
+    Compare results against a saved baseline.
+    :param name: name of the baseline.
+    :param settings: settings of this run, warning if they differ from the baseline's.
+    :param results: results of this run.
+    :param tolerance: fraction p95 latency & throughput may be worse by before it is a regression.
+    Returns:
+        (list) description of each regression.
+    """
+    with open(baseline_path(name), "r") as file:
+        baseline = json.load(file)
+
+    if baseline["settings"] != settings:
+        print(f"Warning: baseline '{name}' was run with different settings: {baseline['settings']}")
+
+    regressions = []
+    for scenario in SCENARIOS:
+        for endpoint, result in results.get(scenario, {}).items():
+            expected = baseline["results"].get(scenario, {}).get(endpoint)
+            if expected is None:
+                continue
+
+            label = f"[{scenario}] {endpoint}"
+            if result["p95"] > expected["p95"] * (1 + tolerance) + LATENCY_SLACK_MS:
+                regressions.append(f"{label}: p95 {result['p95']}ms, baseline {expected['p95']}ms")
+            if result["throughput"] < expected["throughput"] * (1 - tolerance):
+                regressions.append(f"{label}: {result['throughput']} requests/s, "
+                                   f"baseline {expected['throughput']} requests/s")
+            if result["errors"] > expected["errors"]:
+                regressions.append(f"{label}: {result['errors']} errors, baseline {expected['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="users signing up.")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests sent at the same time.")
+    parser.add_argument("--polls", type=int, default=5, help="times each user polls /users/partner.")
+    parser.add_argument("--upload-size", type=int, default=256 * 1024, help="bytes of each uploaded artwork.")
+    parser.add_argument("--discord-latency", type=float, default=0.0,
+                        help="seconds the fake discord api takes to respond.")
+    parser.add_argument("--thumbnail-workers", type=int, default=0)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--save-baseline", metavar="NAME", help="save the results as a baseline.")
+    parser.add_argument("--compare", metavar="NAME", help="compare the results against a baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="how much worse than the baseline is allowed (default 0.2, 20%%).")
+    parser.add_argument("--keep", action="store_true", help="keep the database, uploads & app log.")
+    parser.add_argument("--server", choices=SERVERS, default="werkzeug",
+                        help="serve the app with a thread per request, gevent's async mode or gunicorn.")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes.")
+    args = parser.parse_args()
+
+    settings = {key: getattr(args, key) for key in
+                ("users", "concurrency", "polls", "upload_size", "discord_latency", "thumbnail_workers", "scenarios")}
+    if args.server != "werkzeug":
+        settings["server"] = args.server
+    if args.server == "gunicorn":
+        settings["workers"] = args.workers
+    results = run(args)
+    print_results(results)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, settings, results)
+
+    if args.compare:
+        regressions = compare(args.compare, settings, results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions against baseline '{args.compare}'.")
+
+if __name__ == "__main__":
+    main()
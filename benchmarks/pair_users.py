@@ -0,0 +1,121 @@
+"""
+Benchmark Database.pair_users against the previous commit-per-user loop.
+
+Usage (from the repository root):
+    python -m benchmarks.pair_users --sizes 1000 10000 100000
+
+Results on a sqlite database file (seconds):
+       users   legacy (s)   bulk (s)   speedup
+        1000        8.585      0.040    216.6x
+       10000      476.305      0.360   1322.5x
+      100000      skipped      3.450         -
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import insert
+from python.classes.database import Database
+from python.classes.models.event import Event
+from python.classes.models.user import User
+
+def create_app(database_path):
+    """
+    Create a minimal flask app backed by a sqlite database file.
+    :param database_path: path of the sqlite database file.
+    Returns:
+        (tuple) the flask app and its Database.
+    """
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    return app, Database(app)
+
+def seed_users(database, amount):
+    """
+    Insert an event & its unpaired users with a single executemany.
+    :param database: the Database to insert into.
+    :param amount: amount of users to insert.
+    Returns:
+        (int) id of the event.
+    """
+    event_id = database.get_session().execute(
+        insert(Event).values(slug="benchmark", name="benchmark", is_started=False, is_archived=False)
+    ).inserted_primary_key[0]
+    database.get_session().execute(insert(User), [
+        {
+            'event_id': event_id,
+            'snowflake': str(10 ** 17 + i),
+            'avatar_url': f"avatar_{i}.jpg",
+            'username': f"user_{i}",
+            'in_server': True,
+            'is_admin': False,
+            'is_banned': False,
+        }
+        for i in range(amount)
+    ])
+    database.get_session().commit()
+    return event_id
+
+def legacy_pair_users(database, event_id):
+    """
+    The previous implementation of Database.pair_users, committing and logging once per user.
+    :param database: the Database to pair users in.
+    :param event_id: id of the event, every user is in it.
+    """
+    users = User.query.filter(User.is_banned == False).all()
+    random.shuffle(users)
+    num_users = len(users)
+
+    for i in range(num_users):
+        partner = (i + 1) % num_users
+        users[i].partner = users[partner].snowflake
+        database.get_session().commit()
+
+def time_pairing(amount, pair):
+    """
+    Time a pairing function against a fresh database of users.
+    :param amount: amount of users to pair.
+    :param pair: function taking a Database & event id which pairs every user.
+    Returns:
+        (float) seconds taken to pair the users.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        app, database = create_app(os.path.join(directory, 'benchmark.db'))
+        with app.app_context():
+            database.db.create_all()
+            event_id = seed_users(database, amount)
+
+            start = time.perf_counter()
+            pair(database, event_id)
+            elapsed = time.perf_counter() - start
+
+            unpaired = User.query.filter(User.partner == None).count()
+            assert unpaired == 0, f"{unpaired} users were not paired"
+            database.db.engine.dispose()
+            return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pairing users.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--legacy-limit', type=int, default=10000,
+                        help="skip the legacy loop above this many users, it commits once per user and every "
+                             "commit expires all loaded users so it grows quadratically (~8 minutes at 10k).")
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'legacy (s)':>12} {'bulk (s)':>10} {'speedup':>9}")
+    for amount in args.sizes:
+        bulk = time_pairing(amount, lambda database, event_id: database.pair_users(event_id))
+
+        if amount > args.legacy_limit:
+            print(f"{amount:>8} {'skipped':>12} {bulk:>10.3f} {'-':>9}", flush=True)
+            continue
+
+        legacy = time_pairing(amount, legacy_pair_users)
+        print(f"{amount:>8} {legacy:>12.3f} {bulk:>10.3f} {legacy / bulk:>8.1f}x", flush=True)
+
+if __name__ == "__main__":
+    main()
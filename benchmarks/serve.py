@@ -0,0 +1,39 @@
+"""
+Run the app for the load test (benchmarks/load_test.py), creating its tables first.
+
+Usage (from the repository root):
+    python -m benchmarks.serve 8080 werkzeug
+    python -m benchmarks.serve 8080 gevent
+    python -m benchmarks.serve 8080 gunicorn 4
+"""
+import os
+import sys
+
+SERVERS = ["werkzeug", "gevent", "gunicorn"]
+
+if __name__ == "__main__" and sys.argv[2:3] == ["gevent"]:
+    # the same as wsgi.py, patching before the app is imported.
+    from gevent import monkey
+    monkey.patch_all()
+
+def main():
+    port = int(sys.argv[1])
+    server = sys.argv[2] if len(sys.argv) > 2 else "werkzeug"
+
+    from app import app, database
+    with app.app_context():
+        database.create_all()
+
+    if server == "gunicorn":
+        # replace this process with gunicorn's master, using the same settings as a deployment.
+        workers = sys.argv[3] if len(sys.argv) > 3 else "2"
+        os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                                  "-b", f"127.0.0.1:{port}", "-w", workers, "app:app"])
+    elif server == "gevent":
+        from gevent.pywsgi import WSGIServer
+        WSGIServer(("127.0.0.1", port), app, spawn=1000, log=None).serve_forever()
+    else:
+        app.run(host="127.0.0.1", port=port, threaded=True)
+
+if __name__ == "__main__":
+    main()
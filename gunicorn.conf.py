@@ -0,0 +1,43 @@
+"""
+Run several worker processes with gunicorn, so the app can use more than one CPU core:
+    gunicorn -c gunicorn.conf.py app:app
+
+Settings can be changed with environment variables (or gunicorn's own command line options):
+    SB_BIND           address to listen on (default 0.0.0.0:8080).
+    SB_WORKERS        worker processes (default 2 per CPU core + 1).
+    SB_WORKER_CLASS   'gthread' for threads in each worker, or 'gevent' for the async mode (see wsgi.py).
+    SB_THREADS        threads per gthread worker (default 4).
+
+Workers must share a secret key (SB_SECRET_KEY or 'secret_key' under 'security' in config.yml), and should
+append to the same log file (SB_LOG_FILE or 'file' under 'logging') to get one log stream.
+"""
+import multiprocessing
+import os
+import sys
+
+bind = os.getenv('SB_BIND', "0.0.0.0:8080")
+workers = int(os.getenv('SB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv('SB_WORKER_CLASS', "gthread")
+threads = int(os.getenv('SB_THREADS', 4))
+worker_connections = int(os.getenv('SB_WORKER_CONNECTIONS', 1000))
+# load the app once and fork it into each worker, gevent workers must patch before the app is loaded instead.
+preload_app = worker_class != "gevent"
+# the /event/stream connections stay open for longer than the default 30 seconds.
+timeout = 120
+
+def on_starting(server):
+    import yaml
+
+    if server.cfg.workers < 2 or server.cfg.preload_app or os.getenv('SB_SECRET_KEY'):
+        return
+
+    with open(os.getenv('SB_CONFIG_PATH', "python/config.yml"), "r") as file:
+        settings = yaml.safe_load(file) or {}
+    if not (settings.get('security') or {}).get('secret_key'):
+        sys.exit("Set SB_SECRET_KEY or 'secret_key' under 'security' in config.yml, so every worker "
+                 "signs sessions with the same key.")
+
+def post_fork(server, worker):
+    # only reset state inherited from the parent when the app was loaded before forking.
+    if "app" in sys.modules:
+        sys.modules["app"].after_fork()
@@ -1,5 +1,6 @@
 from flask import Blueprint, request
 from flask_discord import requires_authorization
+from python.classes.events import events
 from app import database, config
 
 ban = Blueprint('ban_blueprint', __name__)
@@ -9,10 +10,10 @@ ban = Blueprint('ban_blueprint', __name__)
 @config.is_admin
 def block(snowflake):
     reason = request.args.get('reason')
-    return database.ban_user(snowflake, reason)
+    return database.ban_user(events.current().id, snowflake, reason)
 
 @ban.route("/unban/<string:snowflake>", methods=['GET'])
 @requires_authorization
 @config.is_admin
 def unblock(snowflake):
-    return database.unban_user(snowflake)
\ No newline at end of file
+    return database.unban_user(events.current().id, snowflake)
\ No newline at end of file
@@ -1,66 +1,231 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, request
 from flask_discord import requires_authorization
-from python.classes.models.user import User
-from app import config, discord, database
+from python.classes.streaming import STREAM_FORMATS, stream_response, parse_limit
+from python.classes.broadcaster import broadcaster, format_event
+from python.classes.pairing import PairingConstraints, PairingError
+from python.classes.events import events
+from python.classes.models.event import Event
+from app import config, database, identity
 
 event = Blueprint('event_blueprint', __name__, url_prefix='/event')
 
+# Define the maximum amount of pairs returned in one page of /pairs.
+MAX_PAGE_SIZE = 1000
+
 @event.route("/countdown")
 def countdown():
     """
-    return a countdown timer until skrapbuk starts.
+    return a countdown timer until the event starts, which browsers & proxies can cache for a few seconds.
     Returns:
          json object of the countdown.
     """
-    return jsonify({"countdown": config.get_countdown()}), 200
+    response = jsonify({"countdown": events.get_countdown(events.current())})
+    response.headers['Cache-Control'] = f"public, max-age={config.find_setting('events', 'countdown_max_age', 5)}"
+    return response, 200
+
+@event.route("/stream")
+def stream():
+    """
+    Server-sent event stream of the countdown, sent every stream_interval seconds, and an 'event_started'
+    event as soon as the event starts, after which the stream ends. Clients should close their EventSource
+    on 'event_started', instead of polling /countdown.
+    Returns:
+        (text/event-stream) the event stream, or (503) if this worker has too many open streams.
+    """
+    slug = events.current().slug
+    version = broadcaster.connect()
+    if version is None:
+        return jsonify({"error": "Too many open event streams, poll /event/countdown instead."}), 503
+
+    response = Response(event_stream(slug, version), mimetype="text/event-stream")
+    # release the connection when the response is closed, even if the body is never read (e.g. HEAD requests
+    # or clients which disconnect straight away).
+    response.call_on_close(broadcaster.disconnect)
+    response.headers['Cache-Control'] = "no-cache"
+    # stop nginx buffering events.
+    response.headers['X-Accel-Buffering'] = "no"
+    return response
+
+def event_stream(slug, version):
+    """
+    Generate the events of an /event/stream connection. The event may also be started by another
+    worker process, which is noticed from the database on the next countdown.
+    :param slug: slug of the event being counted down to.
+    :param version: broadcaster version the connection was opened at.
+    Returns:
+        (generator) server-sent events.
+    """
+    interval = config.find_setting('events', 'stream_interval', 15)
+    # reconnect after the same interval if the connection drops.
+    yield f"retry: {int(interval * 1000)}\n\n"
+
+    while True:
+        current_event = events.get(slug)
+        if current_event is None or current_event.is_started:
+            yield format_event('event_started', {"started": True, "event": slug})
+            return
+
+        yield format_event('countdown', {
+            "countdown": events.get_countdown(current_event),
+            "seconds": events.seconds_until_start(current_event)
+        })
+
+        for version, name, data in broadcaster.wait(version, interval):
+            # other events are published to the same broadcaster.
+            if data.get('event') != slug:
+                continue
+            yield format_event(name, data, version)
+            if name == 'event_started':
+                return
+
+        interval = config.find_setting('events', 'stream_interval', 15)
 
 @event.route("/start")
 @requires_authorization
 @config.is_admin
 def start():
     """
-    Start the skrapbuk event by assigning partners if the config is set to False.
-    This action can be overridden with the "/restart" endpoint.
+    Start the skrapbuk event ('?event=<slug>' or the default event) by assigning partners, if it hasn't
+    been started already.
 
     Returns:
-        (json) message indicating skrapbuk has been started or a message informing the
-        admin that it has already been initiated.
+        (json) message indicating skrapbuk has been started (and if only 2 users were paired with each other)
+        or a message informing the admin that it has already been initiated.
     """
-    is_started = config.find_value('is_started')
-    started_by = discord.fetch_user().username
+    started_by = identity.fetch_user().username
+    current_event = events.current()
+
+    # only one worker can mark the event as started, and pairs users in the same transaction.
+    try:
+        started = database.start_event(
+            current_event.id,
+            PairingConstraints.from_settings(config.current().settings.get('pairing')),
+            seed=config.find_setting('pairing', 'seed'),
+            avoid_previous=config.find_setting('pairing', 'avoid_previous', False)
+        )
+    except PairingError as error:
+        return jsonify({"error": str(error), "report": error.report}), 400
+    events.invalidate(current_event.slug)
 
-    if not is_started:
-        database.pair_users()
-        config.update_value('is_started', True)
-        return jsonify({"message": f"Skrapbuk Started by {started_by}!"}), 200
+    if started:
+        broadcaster.publish('event_started', {"started": True, "event": current_event.slug})
+        message = f"Skrapbuk Started by {started_by}!"
+        # a cycle of 2 users can't avoid pairing them with each other.
+        if len(database.get_pairs(current_event.id, limit=3).all()) == 2:
+            message += " Only 2 users signed up, so they are each other's partner."
+        return jsonify({"message": message}), 200
     else:
         return jsonify({"message": f"Skrapbuk event has already been started by {started_by}."}), 200
 
+@event.route("/all")
+@requires_authorization
+@config.is_admin
+def all_events():
+    """
+    A function to show admins every event, including archived events.
+    Returns:
+        (json) list of events.
+    """
+    return jsonify([current_event.to_json() for current_event in Event.query.order_by(Event.id)])
+
+@event.route("/create", methods=['POST'])
+@requires_authorization
+@config.is_admin
+def create_event():
+    """
+    Create a new event from a json object of its slug, name, server & start_time (unix timestamp),
+    users take part in it with '?event=<slug>'.
+    Returns:
+        (json) message indicating the event has been created, or an error.
+    """
+    data = request.get_json(silent=True) or {}
+
+    required_fields = ['slug', 'name', 'server', 'start_time']
+    missing_fields = [field for field in required_fields if data.get(field) in (None, "")]
+    if missing_fields:
+        return jsonify({"error": f"Missing required JSON fields: {', '.join(missing_fields)}."}), 400
+
+    slug = str(data['slug'])
+    if len(slug) > 64 or not all(character.isalnum() or character in "-_" for character in slug):
+        return jsonify({"error": "slug must be up to 64 letters, numbers, '-' or '_'."}), 400
+
+    try:
+        server = int(data['server'])
+        start_time = int(data['start_time'])
+    except (TypeError, ValueError):
+        return jsonify({"error": "server & start_time must be numbers."}), 400
+
+    return database.create_event(slug, str(data['name'])[:255], server, start_time)
+
+@event.route("/archive")
+@requires_authorization
+@config.is_admin
+def archive():
+    """
+    Archive a finished event ('?event=<slug>'), moving its users, answers, artwork & bans out of the tables
+    used by running events. The default event can't be archived.
+    Returns:
+        (json) message with the amount of rows archived from each table.
+    """
+    current_event = events.current()
+    if current_event.slug == events.default:
+        return jsonify({"error": "The default event can't be archived, change 'default' under 'events' in "
+                                 "config.yml first."}), 400
+
+    archived = database.archive_event(current_event.id)
+    events.invalidate(current_event.slug)
+    return jsonify({"message": f"Archived the '{current_event.slug}' event.", "archived": archived}), 200
+
 @event.route("/pairs")
 @requires_authorization
 @config.is_admin
 def get_partners():
     """
     A function to show admins each user and their respective 'partner'.
+    Supports keyset pagination with '?after=<snowflake>&limit=<amount>', or streaming every pair
+    with '?stream=json' or '?stream=ndjson'.
 
     Returns:
         (Json) object of user information and their 'partner' information.
     """
-    # Return all users with a partner
-    users = User.query.filter(User.is_banned == False).all()
-    user_partner_pairs = []
-    # iterate over each user
-    for user in users:
-        # find the data about a partner
-        partner_data = User.query.filter_by(snowflake=user.partner).first()
-        # create dict with the user & partner data.
-        user_data = {
-            'snowflake' : user.snowflake,
-            'username' : user.username,
-            'partner' : {
-                'snowflake' : partner_data.snowflake,
-                'username' : partner_data.username
-            }
+    event_id = events.current().id
+    after = request.args.get('after')
+    limit = request.args.get('limit')
+    stream_format = request.args.get('stream')
+
+    if stream_format is not None:
+        if stream_format not in STREAM_FORMATS:
+            return jsonify({"error": f"Unknown stream format '{stream_format}', "
+                                     f"use one of: {', '.join(sorted(STREAM_FORMATS))}."}), 400
+
+        # stream rows from the database in batches rather than loading them all at once.
+        pairs = database.get_pairs(event_id, after=after).yield_per(MAX_PAGE_SIZE)
+        return stream_response((pair_to_json(pair) for pair in pairs), stream_format)
+
+    if limit is None and after is None:
+        return jsonify([pair_to_json(pair) for pair in database.get_pairs(event_id)])
+
+    limit = parse_limit(limit, MAX_PAGE_SIZE)
+    if limit is None:
+        return jsonify({"error": f"limit must be a number between 1 and {MAX_PAGE_SIZE}."}), 400
+
+    user_partner_pairs = [pair_to_json(pair) for pair in database.get_pairs(event_id, after=after, limit=limit)]
+    next_after = user_partner_pairs[-1]['snowflake'] if len(user_partner_pairs) == limit else None
+
+    return jsonify({"pairs": user_partner_pairs, "next": next_after})
+
+def pair_to_json(pair) -> dict:
+    """
+    Create dict with the user & partner data.
+    :param pair: row returned from Database.get_pairs.
+    Returns:
+        (dict) user information and their 'partner' information.
+    """
+    return {
+        'snowflake' : pair.snowflake,
+        'username' : pair.username,
+        'partner' : {
+            'snowflake' : pair.partner_snowflake,
+            'username' : pair.partner_username
         }
-        user_partner_pairs.append(user_data)
-    return jsonify(user_partner_pairs)
\ No newline at end of file
+    }
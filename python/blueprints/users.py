@@ -1,28 +1,57 @@
 import os
 
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_discord import requires_authorization
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
 from python.classes.models.user import User
 from python.classes.models.answers import Answers
 from python.classes.models.artwork import Artwork
-from app import app, database, config, discord, logger
+from python.classes.thumbnails import thumbnails
+from python.classes.artwork_store import artwork_store
+from python.classes.events import events
+from python.classes.partner_cards import partner_cards
+from python.classes.zip_stream import stream_zip, archive_name
+from python.classes.streaming import STREAM_FORMATS, stream_response, parse_limit, parse_bool
+from app import app, database, config, identity, membership, logger
 
 users = Blueprint('users_blueprint', __name__, url_prefix='/users')
 
 ALLOWED_FORMATS = {"png", "jpg", "jpeg", "gif", "mp3", "mp4"}
 # Define the maximum file size (in bytes) (default 50MB)
 MAX_FILE_SIZE = 50 * 1024 * 1024
+# Allowance for multipart form headers when checking the request size (default 64KB)
+MAX_FORM_OVERHEAD = 64 * 1024
+# Define the maximum amount of users returned in one page of /all.
+MAX_PAGE_SIZE = 1000
+# Answers table column of each question, in the order they are asked.
+ANSWER_COLUMNS = {
+    'game': 'fav_game',
+    'colour': 'fav_colour',
+    'song': 'fav_song',
+    'film': 'fav_film',
+    'food': 'fav_food',
+    'hobby': 'hobby_interest',
+}
+# Define the maximum amount of characters in each answer.
+MAX_ANSWER_LENGTH = 280
+# Define the amount of answers saved in each statement of /answers/import.
+IMPORT_BATCH_SIZE = 500
+# Define the maximum amount of invalid answers listed in an /answers/import error.
+MAX_IMPORT_ERRORS = 20
+# Seconds browsers may reuse artwork before revalidating it with its ETag (default 0, always revalidate)
+ARTWORK_MAX_AGE = 0
 
 @requires_authorization
 def in_server() -> bool:
-    # check if user is in the server
-    return any(guild.id == config.find_value('server') for guild in discord.fetch_guilds())
+    # check if user is in the event's server, cached by snowflake for a short time.
+    return membership.is_member(identity.fetch_user().id, events.current().server)
 
 @requires_authorization
 def is_admin() -> bool:
     # check if user is an admin from config.yml
-    return discord.fetch_user().id in config.get_admins()
+    return identity.fetch_user().id in config.get_admins()
 
 @users.route("/me", methods=['GET'])
 @requires_authorization
@@ -33,7 +62,7 @@ def user_info():
     with a modified scope as a Json object.
     """
     # get logged in user from flask
-    flask_discord_user = discord.fetch_user()
+    flask_discord_user = identity.fetch_user()
 
     # create user with less info as @requires_authorisation does not check scopes.
     user = User(
@@ -52,69 +81,95 @@ def user_info():
 def set_answers():
     """
     Allow users to set their answers to the questions in the 'answers' database table.
+    Answers are created or updated with a single upsert, so saving twice at once can't create duplicate answers.
     Returns:
-        (json) Response message with success or failure based on the questions being created or updated.
+        (json) Response message with success or failure based on the questions being saved.
     """
     data = request.get_json()
 
+    error = validate_answers(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    discord_user = identity.fetch_user()
+    event_id = events.current().id
+    database.upsert_answers([answers_row(event_id, discord_user.id, data)])
+    # whoever has this user as their partner sees the new answers.
+    partner_cards.invalidate_partner(event_id, discord_user.id)
+
+    return jsonify({"message": f"Thanks {discord_user.username} we've saved your answers."}), 200
+
+def validate_answers(data):
+    """
+    Check answers to the questions are complete and within the character limit.
+    :param data: (json) answers to validate.
+    Returns:
+        (str) error message describing the problem, or None if the answers are valid.
+    """
     # check if json is in acceptable format.
-    required_fields = ['game', 'colour', 'song', 'film', 'food', 'hobby']
-    if not all(field in data for field in required_fields):
-        return jsonify({"error": "Missing required JSON fields."}), 400
+    if not isinstance(data, dict) or not all(field in data for field in ANSWER_COLUMNS):
+        return "Missing required JSON fields."
 
     # check if a user has filled in every question, error if any are empty.
-    empty_answers = [field for field in required_fields if not data.get(field)]
+    empty_answers = [field for field in ANSWER_COLUMNS if not data.get(field)]
     if empty_answers:
-        return jsonify({"error": f"The following answers are empty: {', '.join(empty_answers)}."}), 400
+        return f"The following answers are empty: {', '.join(empty_answers)}."
 
     # check if any answers exceeds 280 characters.
-    exceeding_answers = [field for field in required_fields if len(str(data[field])) > 280]
+    exceeding_answers = [field for field in ANSWER_COLUMNS if len(str(data[field])) > MAX_ANSWER_LENGTH]
     if exceeding_answers:
-        return jsonify({"error": f"The following answers exceed the character limit:"
-                                 f" {', '.join(exceeding_answers)}."}), 400
-
-    username = discord.fetch_user().username
-    user_snowflake = discord.fetch_user().id
-
-    # check if answers already exist, if so update them.
-    if update_answers(user_snowflake, data):
-        return jsonify({"message": f"Answers have been updated."}), 200
-
-    # answers didn't exist, create new row in answers table and save them.
-    user_answers = Answers(
-        user_snowflake=user_snowflake,
-        fav_game=data['game'],
-        fav_colour=data['colour'],
-        fav_song=data['song'],
-        fav_film=data['film'],
-        fav_food=data['food'],
-        hobby_interest=data['hobby']
-    )
+        return f"The following answers exceed the character limit: {', '.join(exceeding_answers)}."
 
-    database.get_session().add(user_answers)
-    database.get_session().commit()
+    return None
 
-    return jsonify({"message": f"Thanks {username} we've saved your answers."}), 200
+def answers_row(event_id, snowflake, data) -> dict:
+    """
+    Create a row of the answers table from validated answers.
+    :param event_id: id of the event the answers are for.
+    :param snowflake: discord snowflake of the user who answered.
+    :param data: (json) validated answers.
+    Returns:
+        (dict) answers table columns & values.
+    """
+    row = {column: str(data[field]) for field, column in ANSWER_COLUMNS.items()}
+    row.update(event_id=event_id, user_snowflake=str(snowflake))
+    return row
 
-def update_answers(snowflake, data) -> bool:
+@users.route("/answers/import", methods=['POST'])
+@requires_authorization
+@config.is_admin
+def import_answers():
     """
-    Function to update questions answers if the user has already created  them.
-    :param snowflake: discord snowflake.
-    :param data: (json) data to update answers.
+    Allow admins to import answers in bulk, e.g. sign-ups from a previous form, as a JSON list of
+    objects with a 'snowflake' and an answer to every question. Existing answers are replaced, so
+    an import can be run again. Nothing is imported if any of the answers are invalid.
     Returns:
-        (bool) returns a bool based on if the user was found and questions were updated.
+        (json) amount of answers imported, or the invalid answers.
     """
-    user_answers = Answers.query.filter_by(user_snowflake=snowflake).first()
-    if user_answers:
-        user_answers.fav_game = data['game']
-        user_answers.fav_colour = data['colour']
-        user_answers.fav_song = data['song']
-        user_answers.fav_film = data['film']
-        user_answers.fav_food = data['food']
-        user_answers.hobby_interest = data['hobby']
-        database.get_session().commit()
-        return True
-    return False
+    data = request.get_json()
+    if not isinstance(data, list):
+        return jsonify({"error": "Answers must be a JSON list."}), 400
+
+    rows, errors = {}, []
+    event_id = events.current().id
+    for index, answers in enumerate(data):
+        snowflake = str(answers.get('snowflake', '')) if isinstance(answers, dict) else ''
+        error = "Missing or invalid snowflake." if not snowflake.isdigit() else validate_answers(answers)
+        if error:
+            errors.append({"index": index, "snowflake": snowflake or None, "error": error})
+            continue
+        # a later row for the same user replaces an earlier one, a batch can't upsert the same row twice.
+        rows[snowflake] = answers_row(event_id, snowflake, answers)
+
+    if errors:
+        return jsonify({"error": f"{len(errors)} of {len(data)} answers are invalid, nothing was imported.",
+                        "invalid": errors[:MAX_IMPORT_ERRORS]}), 400
+
+    imported = database.upsert_answers(list(rows.values()), batch_size=IMPORT_BATCH_SIZE)
+    partner_cards.clear_event(event_id)
+    logger.queue_message(f"{identity.fetch_user().username} imported {imported} answers.", 'INFO')
+
+    return jsonify({"message": f"Imported {imported} answers.", "imported": imported}), 200
 
 @users.route("/answers", methods=['GET'])
 @requires_authorization
@@ -129,11 +184,11 @@ def get_answers(snowflake=None):
         (dict/json) object of users answers.
     """
     if snowflake is None:
-        user_snowflake = discord.fetch_user().id
+        user_snowflake = identity.fetch_user().id
     else:
         user_snowflake = snowflake
 
-    user_answers = Answers.query.filter_by(user_snowflake=user_snowflake).first()
+    user_answers = Answers.query.filter_by(event_id=events.current().id, user_snowflake=user_snowflake).first()
     if user_answers:
         answers_json = {
             'game': user_answers.fav_game,
@@ -160,17 +215,19 @@ def join():
     Returns:
         (json) Success or failure response message based on if the user has joined the event.
     """
-    username = discord.fetch_user().username
-    snowflake = discord.fetch_user().id
-    avatar_url = discord.fetch_user().avatar_url
+    discord_user = identity.fetch_user()
+    username = discord_user.username
+    snowflake = discord_user.id
+    avatar_url = discord_user.avatar_url
 
     # check if user in server
-    if not in_server:
+    user_in_server = in_server()
+    if not user_in_server:
         return jsonify({"error" : "You have to be part of the Gom's Garden server "
                                   "to join the skrapbuk christmas event."}), 400
 
     # check if user has already joined event
-    has_joined = User.query.filter_by(snowflake=discord.fetch_user().id).first()
+    has_joined = User.query.filter_by(event_id=events.current().id, snowflake=snowflake).first()
     if has_joined:
         return jsonify({"error" : f"Woah! {username} you are already in! "
                                   f"Check the countdown to see how long until you can start!",
@@ -182,8 +239,9 @@ def join():
         snowflake=snowflake,
         avatar_url=avatar_url,
         username=username,
-        in_server=in_server(),
-        is_admin=is_admin()
+        in_server=user_in_server,
+        is_admin=is_admin(),
+        event_id=events.current().id
     )
 
     database.add_user(new_user)
@@ -199,28 +257,22 @@ def join():
 @users.route("/partner", methods=['GET'])
 @requires_authorization
 @config.is_banned
-@config.has_partner
 def user_partner():
     """
     Request a users partner information and answers to create artwork from.
+    Served from the partner card cache, so it doesn't query the database once the event has been loaded.
     Returns:
         (json) object with partner info and answers.
     """
-    snowflake = discord.fetch_user().id
-    partner_snowflake = User.query.filter_by(snowflake=snowflake).first().partner
-    partner = User.query.filter_by(snowflake=partner_snowflake).first()
+    discord_user = identity.fetch_user()
 
-    # return limited information about the partner i.e. discord snowflake, username and avatar url.
-    partner_info = {
-        'snowflake' : partner.snowflake,
-        'username' : partner.username,
-        'avatar_url' : partner.avatar_url,
-    }
+    # limited information about the partner i.e. discord snowflake, username and avatar url, and their answers.
+    card = partner_cards.get(events.current(), discord_user.id)
+    if card is None:
+        logger.queue_message(f"{discord_user.username} ({discord_user.id}) does not have a partner", 'INFO')
+        return jsonify({"error": f"Woah {discord_user.username}, its not time to see who your recipient is."}), 400
 
-    return jsonify({
-        "details" : partner_info,
-        "answers" : get_answers(snowflake=partner_snowflake)
-    })
+    return jsonify(card)
 
 @users.route("/upload", methods=['POST'])
 @requires_authorization
@@ -232,11 +284,43 @@ def upload_artwork():
     Returns:
         (json) message if the file is uploaded successfully or unsuccessfully.
     """
+    # reject uploads which are too large from the request headers, before the body is read.
+    if request.content_length and request.content_length > MAX_FILE_SIZE + MAX_FORM_OVERHEAD:
+        return jsonify({"error": "File size exceeds the maximum allowed size. (max 50MB)"}), 400
+
+    # uploaded files are written straight into temporary files in the upload folder by the form parser, hashed &
+    # size checked as they arrive. uploads without a Content-Length are limited by MAX_CONTENT_LENGTH as well.
+    uploads = []
+    try:
+        try:
+            _, _, files = parse_form_data(
+                request.environ,
+                stream_factory=artwork_store.stream_factory(MAX_FILE_SIZE, uploads),
+                max_form_memory_size=request.max_form_memory_size,
+                max_content_length=request.max_content_length,
+                max_form_parts=request.max_form_parts
+            )
+        except RequestEntityTooLarge:
+            return jsonify({"error": "File size exceeds the maximum allowed size. (max 50MB)"}), 400
+
+        return save_artwork(files)
+    finally:
+        # remove the temporary files of uploads which weren't saved, e.g. rejected uploads or other file fields.
+        for upload_file in uploads:
+            upload_file.discard()
+
+def save_artwork(files):
+    """
+    Save the 'image' file of an upload as the user's artwork.
+    :param files: files of the parsed upload form, written to UploadFiles.
+    Returns:
+        (json) message if the file is uploaded successfully or unsuccessfully.
+    """
     # check if request has a file part
-    if 'image' not in request.files:
+    if 'image' not in files:
         return jsonify({"error": "No file part"}), 400
 
-    file = request.files["image"]
+    file = files["image"]
     original_filename = file.filename
 
     # check if the filename is blank
@@ -245,24 +329,28 @@ def upload_artwork():
 
     # if the file exists, and is in an accepted image format .gif, .png, etc...
     if file and accepted_image_format(original_filename):
-        user = User.query.filter_by(snowflake=discord.fetch_user().id).first()
-
-        # If a support file format, check the file size in memory.
-        file_size = getattr(file, 'content_length', 0) or len(file.read())
-        file.seek(0)  # Reset the file cursor
-
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({"error": "File size exceeds the maximum allowed size. (max 50MB)"}), 400
+        user = User.query.filter_by(event_id=events.current().id, snowflake=identity.fetch_user().id).first()
 
         # check if the user exists
         if user:
-            # get the partner and set a new filename
-            partner = User.query.filter_by(snowflake=user.partner).first()
-            new_filename = f"{user.username}_{partner.username}_{generate_timestamp(original_filename)}"
+            # the file is stored by its hash, so uploading the same file again (or a file someone else has
+            # uploaded) doesn't write it twice.
+            extension = original_filename.rsplit(".", 1)[1]
+            upload = file.stream.stored(extension)
 
             # check if the user has already submitted artwork and update it.
-            handle_existing_artwork(user, new_filename)
-            save_file(file, new_filename)
+            try:
+                upload.place()
+                artwork, changed = handle_existing_artwork(user, upload)
+            except Exception:
+                # the database was not updated, so the file is removed unless other artwork uses it.
+                upload.discard()
+                raise
+            upload.finish()
+
+            # generate a thumbnail in the background for the admin gallery.
+            if changed:
+                thumbnails.submit(database, app.config['UPLOAD_FOLDER'], artwork.id, upload.path)
 
             return jsonify({"message": "Artwork Uploaded Successfully."}), 200
 
@@ -273,43 +361,74 @@ def upload_artwork():
         return jsonify({"error": f"Oops! We don't support the '{extension}' file extension. "
                                  f"the supported file formats are: [{allowed_formats_str.upper()}]"}), 400
 
-def handle_existing_artwork(user, filename):
+def handle_existing_artwork(user, upload):
     """
-    Handle users who have already submitted artwork by deleting the existing file
-    and replacing it with the new file.
+    Handle users who have already submitted artwork by pointing their artwork entry at the new file, then
+    removing the previous file unless other artwork uses it. This is only called once the new file has been saved.
     :param user: the user who is attempting to replace the file.
-    :param filename: filename of the new file.
+    :param upload: (StoredUpload) the saved file.
+    Returns:
+        (tuple) the user's updated or new artwork entry, and False if they re-uploaded the same file.
     """
-    existing_artwork = Artwork.query.filter_by(created_by=user.snowflake).first()
+    existing_artwork = Artwork.query.filter_by(event_id=user.event_id, created_by=user.snowflake).first()
     if existing_artwork:
-        existing_file_path = os.path.join(app.config['UPLOAD_FOLDER'], existing_artwork.image_path)
+        if existing_artwork.image_path == upload.path:
+            return existing_artwork, False
 
-        if os.path.exists(existing_file_path):
-            os.remove(existing_file_path)
+        existing_filename = existing_artwork.image_path
+        existing_hash = existing_artwork.content_hash
+        existing_thumbnail = existing_artwork.thumbnail_path
+        database.update_existing_artwork(existing_artwork, upload.path, upload.digest)
+        artwork_store.release(existing_filename, existing_hash, existing_thumbnail)
+        return existing_artwork, True
 
-        database.update_existing_artwork(existing_artwork, filename)
-    else:
-        database.create_artwork_entry(user, filename)
+    return database.create_artwork_entry(user, upload.path, upload.digest), True
 
-def save_file(file, new_filename):
+def artwork_etag(artwork) -> str:
     """
-    Function to save file / artwork to the file system.
-    :param file: The file to be saved.
-    :param new_filename: the file's filename.
+    Generate a strong ETag for an artwork entry, which changes whenever the artwork is replaced.
+    :param artwork: the artwork entry.
+    Returns:
+        (str) SHA-256 of the artwork, or its id and upload time if it was uploaded before files were hashed
+        e.g. 12-1703462399
     """
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], new_filename)
-    file.save(filepath)
+    if artwork.content_hash:
+        return artwork.content_hash
+    created_at = int(artwork.created_at.timestamp()) if artwork.created_at else 0
+    return f"{artwork.id}-{created_at}"
 
-def generate_timestamp(filename):
+def send_artwork(artwork):
     """
-    Generate a timestamp for the file, keeping its existing extension.
-    :param filename to get extension from.
+    Send an artwork file with an ETag, so browsers can revalidate it with If-None-Match (304 Not Modified)
+    and request parts of it with a Range header (206 Partial Content) when seeking through media.
+    Sends the artwork's thumbnail instead when requested with '?size=thumb'.
+    :param artwork: the artwork entry to send.
     Returns:
-        string of timestamp and file extension e.g. 01112023005121.png
+        (Response) the full file, part of it, or an empty 304 response.
     """
-    timestamp = datetime.now().strftime('%d%m%Y%H%M%S')
-    file_extension = os.path.splitext(filename)
-    return f'{timestamp}{file_extension[1]}'
+    filename = artwork.image_path
+    etag = artwork_etag(artwork)
+
+    if request.args.get('size') == 'thumb':
+        if not artwork.thumbnail_path:
+            return jsonify({"error": "There is no thumbnail for this artwork yet."}), 400
+        filename = artwork.thumbnail_path
+        etag = f"{etag}-thumb"
+
+    response = send_from_directory(
+        app.config['UPLOAD_FOLDER'],
+        filename,
+        etag=etag,
+        conditional=True
+    )
+
+    # artwork is only visible to logged-in users and can be replaced, so browsers must revalidate it.
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.no_cache = None
+    response.cache_control.max_age = ARTWORK_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response
 
 def accepted_image_format(filename) -> bool:
     """
@@ -329,14 +448,14 @@ def uploaded_file():
         (file) if the artwork exists return the image/file.
         (json) error message indicating the user or artwork doesn't exist.
     """
-    snowflake = discord.fetch_user().id
-    user = User.query.filter_by(snowflake=snowflake).first()
+    snowflake = identity.fetch_user().id
+    user = User.query.filter_by(event_id=events.current().id, snowflake=snowflake).first()
 
     if user:
-        user_artwork = Artwork.query.filter_by(created_by=user.snowflake).first()
+        user_artwork = Artwork.query.filter_by(event_id=user.event_id, created_by=user.snowflake).first()
 
         if user_artwork:
-            return send_from_directory(app.config['UPLOAD_FOLDER'], user_artwork.image_path), 200
+            return send_artwork(user_artwork)
         else:
             return jsonify({"error": f"You've not uploaded any artwork yet!"}), 400
 
@@ -348,9 +467,64 @@ def uploaded_file():
 @config.is_admin
 def all_users():
     """
-    Function for admins to get all the users from the database and return them as a Json object.
+    Function for admins to get all the users in an event from the database and return them as a Json object.
+    Supports keyset pagination with '?after=<id>&limit=<amount>', filtering with '?is_banned=',
+    '?has_partner=' & '?in_server=' (true / false), and streaming every user with '?stream=json' or '?stream=ndjson'.
     """
-    return database.get_all_users()
+    event_id = events.current().id
+    after = request.args.get('after')
+    limit = request.args.get('limit')
+    stream_format = request.args.get('stream')
+
+    filters = {}
+    for name in ('is_banned', 'has_partner', 'in_server'):
+        value = request.args.get(name)
+        if value is not None:
+            filters[name] = parse_bool(value)
+            if filters[name] is None:
+                return jsonify({"error": f"{name} must be true or false."}), 400
+
+    if after is not None:
+        if not after.isdigit():
+            return jsonify({"error": "after must be a user id."}), 400
+        after = int(after)
+
+    if stream_format is not None:
+        if stream_format not in STREAM_FORMATS:
+            return jsonify({"error": f"Unknown stream format '{stream_format}', "
+                                     f"use one of: {', '.join(sorted(STREAM_FORMATS))}."}), 400
+
+        rows = database.get_users(event_id, after=after, yield_per=MAX_PAGE_SIZE, **filters)
+        return stream_response((user_row_to_json(row) for row in rows), stream_format)
+
+    if limit is None and after is None:
+        return jsonify([user_row_to_json(row) for row in database.get_users(event_id, **filters)])
+
+    limit = parse_limit(limit, MAX_PAGE_SIZE)
+    if limit is None:
+        return jsonify({"error": f"limit must be a number between 1 and {MAX_PAGE_SIZE}."}), 400
+
+    rows = database.get_users(event_id, after=after, limit=limit, **filters).all()
+    next_after = rows[-1].id if len(rows) == limit else None
+
+    return jsonify({"users": [user_row_to_json(row) for row in rows], "next": next_after})
+
+def user_row_to_json(row) -> dict:
+    """
+    Create the same json object as User.to_json from a row returned by Database.get_users.
+    :param row: user row.
+    Returns:
+        (dict) user information.
+    """
+    return {
+        'snowflake': row.snowflake,
+        'avatar_url': row.avatar_url,
+        'username': row.username,
+        'partner': row.partner,
+        'in_server': row.in_server,
+        'is_admin': row.is_admin,
+        'is_banned': row.is_banned
+    }
 
 @users.route("/artwork/<snowflake>", methods=["GET"])
 @requires_authorization
@@ -363,12 +537,53 @@ def get_artwork_from_id(snowflake):
         (file) if successful the uploaded file for the desired user.
         (json) response error response message.
     """
-    user = User.query.filter_by(snowflake=snowflake).first()
+    user = User.query.filter_by(event_id=events.current().id, snowflake=snowflake).first()
     if user:
-        artwork = Artwork.query.filter_by(created_by=user.snowflake).first()
+        artwork = Artwork.query.filter_by(event_id=user.event_id, created_by=user.snowflake).first()
         if artwork:
-            return send_from_directory(app.config['UPLOAD_FOLDER'], artwork.image_path)
+            return send_artwork(artwork)
         else:
             return jsonify({"error": f"No artwork for user {user.snowflake}"}), 400
     else:
-        return jsonify({"error": f"No user with {snowflake} snowflake."}), 400
\ No newline at end of file
+        return jsonify({"error": f"No user with {snowflake} snowflake."}), 400
+
+@users.route("/artwork/export", methods=["GET"])
+@requires_authorization
+@config.is_admin
+def export_artwork():
+    """
+    Function to allow admins to download every uploaded artwork as a ZIP, streamed as it is created.
+    Use '?since=<unix timestamp or ISO date>' to only export artwork uploaded since a previous export,
+    the X-Export-Until header of each export is the value to use for the next one.
+    Returns:
+        (file) ZIP of artwork named by the user who created it and their partner.
+        (json) error message if the since parameter is invalid.
+    """
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = datetime.fromtimestamp(int(since)) if since.isdigit() else datetime.fromisoformat(since)
+        except ValueError:
+            return jsonify({"error": f"'{since}' is not a unix timestamp or ISO date."}), 400
+
+    export_until = int(datetime.now().timestamp())
+    artwork = database.get_artwork_export(events.current().id, since).yield_per(100)
+
+    def artwork_files():
+        upload_folder = app.config['UPLOAD_FOLDER']
+        for row in artwork:
+            file_path = os.path.join(upload_folder, row.image_path)
+            if not os.path.isfile(file_path):
+                logger.queue_message(f"Skipped missing artwork file {row.image_path} in export.", 'ERROR')
+                continue
+
+            name = archive_name(
+                row.creator_username, row.created_by, "for", row.partner_username, row.partner_snowflake,
+                extension=os.path.splitext(row.image_path)[1]
+            )
+            yield name, file_path
+
+    response = Response(stream_with_context(stream_zip(artwork_files())), mimetype="application/zip")
+    response.headers["Content-Disposition"] = f"attachment; filename=skrapbuk_artwork_{export_until}.zip"
+    response.headers["X-Export-Until"] = str(export_until)
+    return response
@@ -0,0 +1,228 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+from sqlalchemy import select, func, union_all
+from werkzeug.exceptions import RequestEntityTooLarge
+from python.classes.models.artwork import Artwork
+from python.classes.models.archive import ARCHIVE_TABLES
+from python.classes.thumbnails import thumbnail_filename
+
+# Folder inside the upload folder where artwork is stored by the SHA-256 hash of its contents.
+ARTWORK_FOLDER = "artwork"
+# Extensions which are saved under another name of the same format, so identical uploads share one file.
+EXTENSION_ALIASES = {"jpeg": "jpg"}
+
+class StoredUpload:
+    """
+    An upload which has been streamed to a temporary file & hashed. It is linked to its content-addressed path
+    before the artwork entry is saved, and the temporary file is kept until the entry is saved in case the same
+    content is released by another request at the same moment.
+    """
+    def __init__(self, store, temp_path, digest, extension):
+        self.store = store
+        self.temp_path = temp_path
+        self.digest = digest
+        self.path = store.content_path(digest, extension)
+
+    def place(self):
+        """
+        Link the upload into its content-addressed path, an identical file which is already stored isn't rewritten.
+        Upload folders which don't support hard links get a copy instead.
+        """
+        full_path = self.store.full_path(self.path)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(self.temp_path, full_path)
+            except FileExistsError:
+                # an identical upload was linked in at the same moment.
+                pass
+            except OSError:
+                # e.g. network & overlay mounts (EPERM, EXDEV, ENOTSUP), copied beside the path first so the
+                # file is never seen half written.
+                copy_fd, copy_path = tempfile.mkstemp(dir=os.path.dirname(full_path), prefix=".copy-")
+                os.close(copy_fd)
+                try:
+                    shutil.copyfile(self.temp_path, copy_path)
+                    os.replace(copy_path, full_path)
+                finally:
+                    if os.path.exists(copy_path):
+                        os.remove(copy_path)
+
+    def finish(self):
+        """
+        Called once the artwork entry referencing the upload is saved. Restores the file if it was removed
+        by another request releasing the same content before the entry was saved, then removes the temporary file.
+        """
+        if os.path.exists(self.temp_path):
+            if not os.path.exists(self.store.full_path(self.path)):
+                os.replace(self.temp_path, self.store.full_path(self.path))
+            else:
+                os.remove(self.temp_path)
+
+    def discard(self):
+        """
+        Called if the artwork entry couldn't be saved, removing the file unless other artwork uses it.
+        """
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.store.release(self.path, self.digest)
+
+class UploadFile:
+    """
+    A temporary file in the upload folder which an uploaded file is written into by the form parser, hashing it as
+    it is written and stopping as soon as it exceeds the maximum size.
+    """
+    def __init__(self, store, max_size):
+        self.store = store
+        self.max_size = max_size
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        temp_fd, self.temp_path = tempfile.mkstemp(dir=store.upload_folder, prefix=".upload-", suffix=".part")
+        self.file = os.fdopen(temp_fd, 'w+b')
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise RequestEntityTooLarge()
+        self.sha256.update(chunk)
+        return self.file.write(chunk)
+
+    def __getattr__(self, name):
+        # seek, read, close etc. are used by the form parser & FileStorage.
+        return getattr(self.file, name)
+
+    def stored(self, extension):
+        """
+        Call once the upload has been parsed, then call place() on the result before saving the artwork entry.
+        :param extension: file extension of the upload.
+        Returns:
+            (StoredUpload) the hashed upload.
+        """
+        self.file.close()
+        return StoredUpload(self.store, self.temp_path, self.sha256.hexdigest(), extension)
+
+    def discard(self):
+        """
+        Remove the temporary file, if it wasn't moved into place or already removed.
+        """
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+class ArtworkStore:
+    """
+    Store uploaded artwork by the SHA-256 hash of its contents (artwork/<first 2 characters>/<hash>.<extension>),
+    hashed while it is written to disk. Identical uploads share one file, which is only removed once no artwork
+    entry (including archived events) references it.
+    """
+    def __init__(self, upload_folder='uploads'):
+        self.upload_folder = upload_folder
+        self.engine = None
+
+    def configure(self, upload_folder):
+        """
+        :param upload_folder: folder artwork & thumbnails are saved to.
+        """
+        self.upload_folder = upload_folder
+
+    def init_app(self, engine):
+        """
+        Count references to files with their own short-lived connections, like Events.
+        :param engine: the database engine.
+        """
+        self.engine = engine
+
+    @staticmethod
+    def content_path(digest, extension) -> str:
+        """
+        Get the path artwork is stored at, relative to the upload folder.
+        :param digest: SHA-256 hex digest of the artwork.
+        :param extension: file extension, kept so the file is served with the right content type.
+        Returns:
+            (str) path e.g. artwork/9f/9f86d081884c7d65....png
+        """
+        extension = extension.lower()
+        return os.path.join(ARTWORK_FOLDER, digest[:2], f"{digest}.{EXTENSION_ALIASES.get(extension, extension)}")
+
+    def full_path(self, path) -> str:
+        """
+        :param path: path relative to the upload folder.
+        Returns:
+            (str) path of the file on disk.
+        """
+        return os.path.join(self.upload_folder, path)
+
+    def stream_factory(self, max_size, uploads):
+        """
+        Create a stream factory for werkzeug's form parser, which writes each uploaded file straight into an
+        UploadFile, so uploads are hashed & size checked as they arrive and only written to disk once.
+        :param max_size: maximum size of each file in bytes.
+        :param uploads: list each created UploadFile is added to, so they can be discarded after the request.
+        Returns:
+            (function) the stream factory.
+        """
+        os.makedirs(self.upload_folder, exist_ok=True)
+
+        def create(total_content_length=None, content_type=None, filename=None, content_length=None):
+            upload_file = UploadFile(self, max_size)
+            uploads.append(upload_file)
+            return upload_file
+        return create
+
+    def references(self, path, digest) -> int:
+        """
+        Count the artwork entries, of running & archived events, which use a file.
+        :param path: path of the file relative to the upload folder.
+        :param digest: SHA-256 hex digest of the file.
+        Returns:
+            (int) amount of artwork entries using the file.
+        """
+        tables = [Artwork.__table__, ARCHIVE_TABLES[Artwork.__table__]]
+        uses = union_all(*(
+            select(table.c.id).where(table.c.content_hash == digest, table.c.image_path == path)
+            for table in tables
+        )).subquery()
+        with self.engine.connect() as connection:
+            return connection.execute(select(func.count()).select_from(uses)).scalar()
+
+    def release(self, path, digest, thumbnail_path=None) -> bool:
+        """
+        Remove a file which artwork no longer uses, and its thumbnail, unless another artwork entry still uses it.
+        Files are renamed away before being checked a second time, so an identical upload saved at the same
+        moment either keeps the file or restores it (see StoredUpload.finish).
+        :param path: path of the file relative to the upload folder.
+        :param digest: SHA-256 hex digest of the file, artwork uploaded before files were hashed has none.
+        :param thumbnail_path: (optional) path of the file's thumbnail relative to the upload folder, defaults to
+            where a thumbnail of the file would be generated.
+        Returns:
+            (bool) if the file was removed.
+        """
+        if not path:
+            return False
+        # files saved before artwork was stored by hash have a unique name, so only one entry uses them.
+        if digest is not None and self.references(path, digest):
+            return False
+
+        suffix = f".{os.getpid()}.{threading.get_ident()}.removing"
+        moved = []
+        for file_path in (path, thumbnail_path or thumbnail_filename(path)):
+            full_path = self.full_path(file_path)
+            try:
+                os.replace(full_path, full_path + suffix)
+                moved.append(full_path)
+            except FileNotFoundError:
+                continue
+
+        if digest is not None and self.references(path, digest):
+            for full_path in moved:
+                os.replace(full_path + suffix, full_path)
+            return False
+
+        for full_path in moved:
+            os.remove(full_path + suffix)
+        return bool(moved)
+
+artwork_store = ArtworkStore()
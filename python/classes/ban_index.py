@@ -0,0 +1,98 @@
+import threading
+import time
+from sqlalchemy import select, insert, update
+from python.classes.database import database
+from python.classes.models.ban_list import BanList, BanVersion
+
+class BanIndex:
+    """
+    In-memory set of banned (event id, snowflake) pairs, so checking if a user is banned doesn't need a database query.
+    The set is updated when users are (un)banned and resynced periodically, so other workers pick up
+    bans made elsewhere.
+    """
+    def __init__(self, resync_interval=30):
+        self.resync_interval = resync_interval
+        self.banned = frozenset()
+        self.version = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def configure(self, resync_interval):
+        """
+        Update how often the ban list is checked for changes made by other workers.
+        :param resync_interval: seconds between checks of the ban_list table.
+        """
+        self.resync_interval = resync_interval
+
+    @staticmethod
+    def current_version():
+        """
+        Get the version of the ban_list table, which goes up whenever a user is banned or unbanned.
+        Returns:
+            (int) the ban version, 0 if the ban list has never changed.
+        """
+        return database.session.execute(select(BanVersion.version)).scalar() or 0
+
+    @staticmethod
+    def bump_version(session):
+        """
+        Increase the ban version, call before committing any change to the ban_list table so the change & the
+        new version are saved together.
+        :param session: the session the ban list is being changed in.
+        """
+        if session.execute(update(BanVersion).values(version=BanVersion.version + 1)).rowcount == 0:
+            session.execute(insert(BanVersion).values(id=1, version=1))
+
+    def load(self):
+        """
+        Load every ban from the ban_list table, replacing the in-memory set.
+        """
+        with self.lock:
+            rows = database.session.query(BanList.event_id, BanList.user_snowflake).all()
+            self.banned = frozenset((row.event_id, str(row.user_snowflake)) for row in rows)
+            self.version = self.current_version()
+            self.checked_at = time.monotonic()
+
+    def resync(self):
+        """
+        Reload the ban list if it has changed since it was last loaded.
+        """
+        if self.current_version() != self.version:
+            self.load()
+        else:
+            self.checked_at = time.monotonic()
+
+    def is_banned(self, snowflake, event_id) -> bool:
+        """
+        Check if a user is banned from an event, resyncing the ban list first if it has not been checked recently.
+        :param snowflake: discord snowflake of the user.
+        :param event_id: id of the event.
+        Returns:
+            (bool) if the user is banned.
+        """
+        if self.checked_at is None:
+            self.load()
+        elif time.monotonic() - self.checked_at >= self.resync_interval:
+            self.resync()
+
+        return (event_id, str(snowflake)) in self.banned
+
+    def add(self, snowflake, event_id):
+        """
+        Add a newly banned user to the ban list.
+        :param snowflake: discord snowflake of the banned user.
+        :param event_id: id of the event they are banned from.
+        """
+        with self.lock:
+            self.banned = self.banned | {(event_id, str(snowflake))}
+
+    def remove(self, snowflake, event_id):
+        """
+        Remove an unbanned user from the ban list.
+        :param snowflake: discord snowflake of the unbanned user.
+        :param event_id: id of the event they were banned from.
+        """
+        with self.lock:
+            self.banned = self.banned - {(event_id, str(snowflake))}
+
+ban_index = BanIndex()
@@ -0,0 +1,89 @@
+import json
+import threading
+from collections import deque
+
+# Amount of recent events kept, so a connection which was busy writing doesn't miss any.
+EVENT_HISTORY = 16
+
+def format_event(name, data, event_id=None) -> str:
+    """
+    Format a server-sent event.
+    :param name: event name e.g. 'countdown'.
+    :param data: json serialisable event data.
+    :param event_id: optional id of the event.
+    Returns:
+        (str) the event in the text/event-stream format.
+    """
+    event = f"event: {name}\n"
+    if event_id is not None:
+        event += f"id: {event_id}\n"
+    return event + f"data: {json.dumps(data)}\n\n"
+
+class Broadcaster:
+    """
+    Push events (e.g. the event starting) to every open server-sent event connection of this process.
+    Connections wait on a shared condition, so an idle connection costs a waiting thread and nothing else.
+    """
+    def __init__(self, max_connections=1000):
+        self.max_connections = max_connections
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=EVENT_HISTORY)
+        self.version = 0
+        self.connections = 0
+
+    def configure(self, max_connections):
+        """
+        Update the maximum amount of open connections.
+        :param max_connections: connections allowed at once, further connections are refused.
+        """
+        self.max_connections = max_connections
+
+    def connect(self):
+        """
+        Register a new connection.
+        Returns:
+            (int) the current event version to wait for newer events from, or None if there are
+            already max_connections open.
+        """
+        with self.condition:
+            if self.connections >= self.max_connections:
+                return None
+            self.connections += 1
+            return self.version
+
+    def disconnect(self):
+        with self.condition:
+            self.connections -= 1
+
+    def publish(self, name, data):
+        """
+        Send an event to every open connection.
+        :param name: event name e.g. 'event_started'.
+        :param data: json serialisable event data.
+        """
+        with self.condition:
+            self.version += 1
+            self.events.append((self.version, name, data))
+            self.condition.notify_all()
+
+    def wait(self, after_version, timeout):
+        """
+        Wait for events published after a version.
+        :param after_version: version of the last event the connection has seen.
+        :param timeout: maximum seconds to wait.
+        Returns:
+            (list) (version, name, data) of each newer event, empty if none were published before the timeout.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.version > after_version, timeout=timeout)
+            return [event for event in self.events if event[0] > after_version]
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            (dict) amount of open connections & events published.
+        """
+        with self.condition:
+            return {"connections": self.connections, "events": self.version}
+
+broadcaster = Broadcaster()
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    A small thread-safe cache with a bounded size, least recently used eviction and a time to live
+    on each entry, used to avoid repeating slow lookups (Discord, database) on every request.
+    """
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Returns:
+            (bool) if the cache can hold any entries, a max size or ttl of 0 disables the cache.
+        """
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key, default=None):
+        """
+        Get a value from the cache, moving it to the front of the LRU order.
+        :param key: key of the cached value.
+        :param default: value returned if the key is missing or has expired.
+        Returns:
+            (any) the cached value or the default.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                self.misses += 1
+                return default
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Add or replace a value in the cache, evicting the least recently used entries when full.
+        :param key: key of the value to cache.
+        :param value: value to cache.
+        :param ttl: (optional) seconds until this entry expires, defaults to the cache ttl.
+        """
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        Remove a single key from the cache if it exists.
+        :param key: key of the value to remove.
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the hit, miss and eviction counters of the cache.
+        Returns:
+            (dict) counters and the current size of the cache.
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.entries),
+            }
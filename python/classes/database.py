@@ -1,36 +1,120 @@
-import random, string
+import time
 
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from sqlalchemy import update, select, insert, delete, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+from sqlalchemy.orm import aliased
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask import jsonify
 database = SQLAlchemy()
 
+from python.classes.models.event import Event
 from python.classes.models.user import User
 from python.classes.logging import Logging
 from python.classes.models.ban_list import BanList
 from python.classes.models.artwork import Artwork
+from python.classes.models.answers import Answers
+from python.classes.models.archive import ARCHIVE_TABLES
+from python.classes.ban_index import ban_index
+from python.classes.partner_cards import partner_cards
+from python.classes.migrations import Migrations
+from python.classes.pairing import PairingConstraints, PairingError, pair_participants
+from python.classes.seeding import SeedData, write_placeholder
 
 logger = Logging()
 
+# Pragmas set on every SQLite connection, WAL lets readers carry on while another connection writes.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,
+}
+
 class Database:
-    def __init__(self, app=None):
+    def __init__(self, app=None, settings=None, default_event=None):
         self.db = database
-        self.db.init_app(app)
         self.app = app
-        # create user table on flask startup.
+        self.settings = settings or {}
+        # details of the event existing rows are moved into when the database is first migrated to events.
+        self.default_event = default_event
+
+        if self.settings.get('uri'):
+            app.config['SQLALCHEMY_DATABASE_URI'] = self.settings['uri']
+
+        self.backend = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).update(self.engine_options())
+        self.db.init_app(app)
+
+        with app.app_context():
+            event.listen(self.db.engine, 'connect', self.on_connect)
+
+    def engine_options(self):
+        """
+        Create the SQLAlchemy engine options from the connection pool settings.
+        Returns:
+            (dict) keyword arguments for create_engine.
+        """
+        url = make_url(self.app.config['SQLALCHEMY_DATABASE_URI'])
+        options = {'pool_pre_ping': self.settings.get('pool_pre_ping', True)}
+
+        # in-memory sqlite databases only exist on one connection, so they don't use a pool.
+        if self.backend == 'sqlite' and url.database in (None, '', ':memory:'):
+            return {}
+
+        for key in ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle'):
+            if self.settings.get(key) is not None:
+                options[key] = self.settings[key]
+        return options
+
+    def on_connect(self, dbapi_connection, connection_record):
+        """
+        Configure each new database connection, setting the statement timeout and SQLite pragmas.
+        :param dbapi_connection: the new DBAPI connection.
+        :param connection_record: the pool's record of the connection.
+        """
+        timeout = self.settings.get('statement_timeout')
+        cursor = dbapi_connection.cursor()
+
+        if self.backend == 'sqlite':
+            for pragma, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            if timeout:
+                cursor.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+        elif self.backend == 'mysql' and timeout:
+            cursor.execute(f"SET SESSION max_execution_time={int(timeout * 1000)}")
+
+        cursor.close()
 
     def create_all(self):
         """
-        Create all database tables and add partner foreign key on startup.
+        Create all database tables and apply migrations (e.g. the partner foreign key) on startup.
         """
         with self.app.app_context():
             self.db.create_all()
+            self.migrate()
 
-            # Add foreign key constraint
-            alter_table_sql = text('ALTER TABLE user ADD CONSTRAINT fk_user_partner FOREIGN KEY (partner) REFERENCES user(snowflake);')
-            self.db.session.execute(alter_table_sql)
-            self.db.session.commit()
+    def migrate(self):
+        """
+        Apply any database migrations which haven't been applied yet, safe to run on every deploy.
+        Returns:
+            (list) versions of the migrations which were applied.
+        """
+        with self.app.app_context():
+            return Migrations(self.db.engine, logger, self.default_event).run()
+
+    def check_query_plans(self):
+        """
+        Check the hot lookup queries use indexes rather than scanning whole tables.
+        Returns:
+            (dict) name & query plan of each query which scans a full table.
+        """
+        with self.app.app_context():
+            return Migrations(self.db.engine, logger, self.default_event).check_query_plans()
 
     def get_session(self):
         """
@@ -48,63 +132,187 @@ class Database:
         self.get_session().add(user)
         self.get_session().commit()
 
-    def seed_data(self, seed_amount):
+    def upsert_answers(self, rows, batch_size=1000):
+        """
+        Create or update users' answers without reading them first, as one INSERT ... ON DUPLICATE KEY UPDATE
+        (MySQL) or INSERT ... ON CONFLICT DO UPDATE (SQLite & PostgreSQL) per batch on the unique
+        (event_id, user_snowflake) index. Saving the same user's answers twice at once can't create duplicate rows.
+        Other databases insert each row and update it instead if it already exists.
+        :param rows: list of dicts of Answers columns, each including event_id & user_snowflake.
+        :param batch_size: rows sent in each statement.
+        Returns:
+            (int) amount of rows created or updated.
         """
-        Generate dummy data for the database, including a snowflake, name and booleans to if they are admin
-        or in the server.
+        statement = self.answers_upsert()
+        try:
+            # every batch is committed together, so an import either saves every row or none of them.
+            if statement is not None:
+                for start in range(0, len(rows), batch_size):
+                    self.get_session().execute(statement, rows[start:start + batch_size])
+            else:
+                for row in rows:
+                    self.insert_or_update_answers(row)
+            self.get_session().commit()
+        except SQLAlchemyError:
+            self.get_session().rollback()
+            logger.queue_message(f"Failed to save {len(rows)} answers, none have been saved.", 'ERROR')
+            raise
+        return len(rows)
+
+    def answers_upsert(self):
+        """
+        Create the upsert statement for the answers table in this database's dialect.
+        Returns:
+            (Insert) insert statement which updates the answers of existing rows, or None if the database
+            doesn't have one.
+        """
+        columns = [column.name for column in Answers.__table__.columns
+                   if column.name not in ('id', 'event_id', 'user_snowflake')]
+
+        if self.backend == 'mysql':
+            statement = mysql.insert(Answers.__table__)
+            return statement.on_duplicate_key_update({column: statement.inserted[column] for column in columns})
+        if self.backend in ('sqlite', 'postgresql'):
+            statement = (sqlite if self.backend == 'sqlite' else postgresql).insert(Answers.__table__)
+            return statement.on_conflict_do_update(
+                index_elements=['event_id', 'user_snowflake'],
+                set_={column: statement.excluded[column] for column in columns}
+            )
+        return None
+
+    def insert_or_update_answers(self, row):
+        """
+        Insert a user's answers, or update them if the unique (event_id, user_snowflake) index shows they have
+        already answered, for databases without an upsert statement.
+        :param row: dict of Answers columns, including event_id & user_snowflake.
+        """
+        session = self.get_session()
+        try:
+            # the insert fails on the unique (event_id, user_snowflake) index when the user has already answered,
+            # or another request inserted their answers at the same moment. the savepoint keeps the rest of the
+            # transaction when it does.
+            with session.begin_nested():
+                session.execute(insert(Answers.__table__), row)
+        except IntegrityError:
+            answers = {column: value for column, value in row.items() if column not in ('event_id', 'user_snowflake')}
+            result = session.execute(
+                update(Answers.__table__)
+                .where(Answers.event_id == row['event_id'], Answers.user_snowflake == row['user_snowflake'])
+                .values(answers)
+            )
+            # no row to update, so the insert broke another constraint (e.g. the event's foreign key).
+            if result.rowcount == 0:
+                raise
+
+    def seed_data(self, seed_amount, event_id, seed=0, chunk_size=10000, paired=False, ban_rate=0.01,
+                  artwork_rate=0.5, upload_folder=None, progress=None) -> dict:
+        """
+        Generate dummy users for an event with their answers, and optionally bans, partners & artwork (see SeedData).
+        Rows are bulk inserted a chunk of users at a time without creating ORM objects, so millions of users can
+        be seeded for load testing. The event must not have any users yet.
         :param seed_amount: Amount of dummy users to be created (e.g. 5).
+        :param event_id: id of the event the users sign up to.
+        :param seed: seed of the generated data, the same seed always creates the same rows.
+        :param chunk_size: users inserted & committed at a time.
+        :param paired: give users partners & artwork, and mark the event as started.
+        :param ban_rate: fraction of users who are banned (0 - 1).
+        :param artwork_rate: fraction of users with a partner who have uploaded artwork (0 - 1).
+        :param upload_folder: (optional) write the placeholder file seeded artwork uses to this folder.
+        :param progress: (optional) called with the rows inserted so far & seconds elapsed after each chunk.
+        Returns:
+            (dict) rows inserted into each table.
         """
+        data = SeedData(seed_amount, event_id, seed, paired, ban_rate, artwork_rate)
+        tables = {'user': User, 'answers': Answers, 'ban_list': BanList, 'artwork': Artwork}
+        counts = dict.fromkeys(tables, 0)
+        started = time.perf_counter()
+
+        if upload_folder:
+            # every seeded artwork shares the same placeholder file.
+            write_placeholder(upload_folder)
+
         with self.app.app_context():
-            generated_users = []
-
-            for i in range(seed_amount):
-                # Generate 18 digit snowflake (same length as discord)
-                random_snowflake = random.randint(10 ** 17, 10 ** 18 - 1)
-                # create a random 'username' from ascii letters (e.g. fxdlzMyP)
-                random_name = ''.join(random.choices(string.ascii_letters, k=random.randint(5, 10)))
-                random_avatar = f"avatar_{random_name}.jpg"
-                random_boolean = random.choice([True, False])
-
-                seed_user = User(
-                    snowflake=random_snowflake,
-                    avatar_url=random_avatar,
-                    username=random_name,
-                    in_server=random_boolean,
-                    is_admin=random_boolean
-                )
+            for chunk in data.chunks(chunk_size):
+                # users first, as the other tables & the next chunk's partners reference them.
+                for name, model in tables.items():
+                    if chunk[name]:
+                        self.get_session().execute(insert(model.__table__), chunk[name])
+                        counts[name] += len(chunk[name])
+                if chunk['ban_list']:
+                    ban_index.bump_version(self.get_session())
+                self.get_session().commit()
 
-                generated_users.append(seed_user)
-                # Debug Print: print(f"Random User: {random_name} ({random_snowflake}) {random_avatar}")
+                if progress:
+                    progress(sum(counts.values()), time.perf_counter() - started)
 
-            # add and commit users to the database session.
-            self.get_session().add_all(generated_users)
-            self.get_session().commit()
+            if data.first_paired is not None:
+                # close the cycle, the first user's partner is the last user.
+                self.get_session().execute(
+                    update(User).where(User.event_id == event_id, User.snowflake == data.first_paired)
+                    .values(partner=data.last_paired)
+                )
+                self.get_session().execute(update(Event).where(Event.id == event_id).values(is_started=True))
+                self.get_session().commit()
 
             # add notification message to the log.
             logger.queue_message(f"Created and inserted {seed_amount} dummy users to the database.",
                                  'CREATED')
 
-    def get_all_users(self):
+        return counts
+
+    def get_users(self, event_id, after=None, limit=None, is_banned=None, has_partner=None, in_server=None,
+                  yield_per=None):
         """
-        Get all signed-up users from user table.
+        Get users signed up to an event from user table, ordered by id. Only the needed columns are selected and
+        rows are returned as-is, skipping the cost of creating User objects.
+        :param event_id: id of the event.
+        :param after: (optional) only return users with an id after this one (keyset pagination).
+        :param limit: (optional) maximum amount of users to return.
+        :param is_banned: (optional) only return users who are / are not banned.
+        :param has_partner: (optional) only return users who have / have not been assigned a partner.
+        :param in_server: (optional) only return users who are / are not in the discord server.
+        :param yield_per: (optional) fetch rows from the database in batches of this size as they are iterated,
+            instead of buffering every row first.
         Returns:
-            (json) list of users as json objects.
+            (Result) rows of user columns.
         """
-        with self.app.app_context():
-            users = User.query.all()
-            return [user.to_json() for user in users]
-
-    def ban_user(self, snowflake, reason):
+        query = select(
+            User.id,
+            User.snowflake,
+            User.avatar_url,
+            User.username,
+            User.partner,
+            User.in_server,
+            User.is_admin,
+            User.is_banned
+        ).where(User.event_id == event_id).order_by(User.id)
+
+        if after is not None:
+            query = query.where(User.id > after)
+        if is_banned is not None:
+            query = query.where(User.is_banned == is_banned)
+        if has_partner is not None:
+            query = query.where(User.partner.isnot(None) if has_partner else User.partner.is_(None))
+        if in_server is not None:
+            query = query.where(User.in_server == in_server)
+        if limit is not None:
+            query = query.limit(limit)
+        if yield_per is not None:
+            query = query.execution_options(yield_per=yield_per)
+
+        return self.get_session().execute(query)
+
+    def ban_user(self, event_id, snowflake, reason):
         """
-        Ban a toxic user by adding their id to a ban_list table and adding an is_banned flag to their
+        Ban a toxic user from an event by adding their id to a ban_list table and adding an is_banned flag to their
         database entry.
+        :param event_id: id of the event.
         :param snowflake: Discord snowflake ID.
         :param reason: a reason for the ban.
         Returns:
             (json) A message informing that the user has either been banned or not found.
         """
-        banned_user = User.query.filter_by(snowflake=snowflake).first()
-        banned_user_snowflake = banned_user.snowflake
+        banned_user = User.query.filter_by(event_id=event_id, snowflake=snowflake).first()
 
         if reason is None:
             reason = "No Reason"
@@ -113,7 +321,8 @@ class Database:
         if banned_user:
 
             # check if the user is already banned
-            existing_ban = BanList.query.filter_by(user_snowflake=snowflake).first()
+            banned_user_snowflake = banned_user.snowflake
+            existing_ban = BanList.query.filter_by(event_id=event_id, user_snowflake=snowflake).first()
             if existing_ban:
                 return jsonify({"message": f"User ({snowflake}) is already banned."}), 200
 
@@ -122,24 +331,28 @@ class Database:
             ban_entry = BanList(
                 user_snowflake=banned_user_snowflake,
                 reason=reason,
-                banned_user=banned_user
+                banned_user=banned_user,
+                event_id=event_id
             )
 
             self.get_session().add(ban_entry)
+            ban_index.bump_version(self.get_session())
             self.get_session().commit()
+            ban_index.add(banned_user_snowflake, event_id)
 
             return jsonify({"message": f"User ({snowflake}) has been banned."}), 200
         else:
             return jsonify({"error": f"User ({snowflake}) not found."}), 400
 
-    def unban_user(self, snowflake):
+    def unban_user(self, event_id, snowflake):
         """
-        Unban a user from their snowflake
+        Unban a user from an event from their snowflake
+        :param event_id: id of the event.
         :param snowflake: id of the user to be unbanned.
         Returns:
             (json) A message informing the user has been unbanned, or not found.
         """
-        banned_user = User.query.filter_by(snowflake=snowflake).first()
+        banned_user = User.query.filter_by(event_id=event_id, snowflake=snowflake).first()
 
         # check if the user exists
         if banned_user:
@@ -148,59 +361,245 @@ class Database:
             banned_user_snowflake = banned_user.snowflake
             banned_user.is_banned = False
 
-            ban_list_entry = BanList.query.filter_by(user_snowflake=banned_user_snowflake).first()
+            ban_list_entry = BanList.query.filter_by(event_id=event_id, user_snowflake=banned_user_snowflake).first()
             # if user is found in the ban list, remove them
             if ban_list_entry:
                 self.get_session().delete(ban_list_entry)
+                ban_index.bump_version(self.get_session())
                 self.get_session().commit()
+                ban_index.remove(banned_user_snowflake, event_id)
                 return jsonify({"message": f"User ({snowflake}) has been unbanned."}), 200
             else:
                 return jsonify({"message": f"User ({snowflake}) is not banned."}), 200
         else:
             return jsonify({"error": f"User ({snowflake}) not found."}), 400
 
-    def pair_users(self):
+    def create_event(self, slug, name, server, start_time):
+        """
+        Create a new event, which users can join with '?event=<slug>'.
+        :param slug: short unique name of the event used in urls e.g. 'christmas-2024'.
+        :param name: display name of the event.
+        :param server: id of the discord server users must be in to join.
+        :param start_time: unix timestamp of when partners are revealed.
+        Returns:
+            (json) A message informing the event has been created, or that the slug is taken.
+        """
+        if Event.query.filter_by(slug=slug).first():
+            return jsonify({"error": f"An event called '{slug}' already exists."}), 400
+
+        self.get_session().add(Event(slug=slug, name=name, server=server, start_time=start_time))
+        self.get_session().commit()
+        logger.queue_message(f"Created the '{slug}' event.", 'CREATED')
+        return jsonify({"message": f"Created the '{slug}' event."}), 200
+
+    def start_event(self, event_id, constraints=None, seed=None, avoid_previous=False) -> bool:
+        """
+        Mark an event as started and pair its users in the same transaction. Only one request can change
+        is_started from false, so an event is never paired twice even when started by two workers at once.
+        :param event_id: id of the event.
+        :param constraints: (optional) PairingConstraints, see pair_users.
+        :param seed: (optional) seed for the shuffle, see pair_users.
+        :param avoid_previous: see pair_users.
+        Returns:
+            (bool) if the event was started, False if it had already been started.
+        Raises:
+            PairingError: if the users can't be paired, the event is left unstarted.
+        """
+        result = self.get_session().execute(
+            update(Event).where(Event.id == event_id, Event.is_started == False).values(is_started=True)
+        )
+        if result.rowcount == 0:
+            self.get_session().rollback()
+            return False
+
+        try:
+            # commits the event & partners together.
+            self.pair_users(event_id, constraints, seed, avoid_previous)
+        except PairingError:
+            self.get_session().rollback()
+            raise
+        return True
+
+    def archive_event(self, event_id):
+        """
+        Move every row of a finished event out of the user, answers, artwork & ban_list tables into their
+        archived_ tables, so the hot tables only hold running events. Uploaded files are kept.
+        :param event_id: id of the event.
+        Returns:
+            (dict) amount of rows archived from each table.
+        """
+        archived = {}
+        session = self.get_session()
+        try:
+            for table, archive in ARCHIVE_TABLES.items():
+                rows = select(*table.columns).where(table.c.event_id == event_id)
+                session.execute(insert(archive).from_select([column.name for column in table.columns], rows))
+
+            # partners reference other users in the event, so they are cleared before the users are deleted.
+            session.execute(update(User.__table__).where(User.event_id == event_id).values(partner=None))
+            for table in ARCHIVE_TABLES:
+                archived[table.name] = session.execute(delete(table).where(table.c.event_id == event_id)).rowcount
+
+            session.execute(update(Event).where(Event.id == event_id).values(is_archived=True))
+            ban_index.bump_version(session)
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            logger.queue_message(f"Failed to archive event {event_id}, no rows have been moved.", 'ERROR')
+            raise
+
+        partner_cards.clear_event(event_id)
+        logger.queue_message(f"Archived event {event_id}: {archived}.", 'INFO')
+        return archived
+
+    def pair_users(self, event_id, constraints=None, seed=None, avoid_previous=False):
         """
-        'pair' all the users that have signed up to the skrapbuk event, by randomly assigning them a 'partner'.
+        'pair' all the users that have signed up to a skrapbuk event, by assigning each of them a 'partner'
+        in a single cycle that respects the pairing constraints (see python/classes/pairing.py).
+        Partners are worked out in memory and saved with a single bulk update, if saving fails no user is paired.
+        :param event_id: id of the event.
+        :param constraints: (optional) PairingConstraints, e.g. exclusions & friends.
+        :param seed: (optional) seed for the shuffle, to make the pairs reproducible.
+        :param avoid_previous: don't give anyone the partner they currently have (e.g. when re-pairing).
+        Raises:
+            PairingError: if the users can't be paired without breaking a constraint, no user is paired.
         """
-        # get all unbanned users & shuffle them.
-        users = User.query.filter(User.is_banned == False).all()
-        random.shuffle(users)
+        # get the id, snowflake & current partner of all unbanned users in the event.
+        users = (self.get_session().query(User.id, User.snowflake, User.partner)
+                 .filter(User.event_id == event_id, User.is_banned == False).order_by(User.id).all())
 
         num_users = len(users)
 
-        logger.queue_message(f"Starting to pair users", 'INFO')
+        logger.queue_message(f"Starting to pair {num_users} users", 'INFO')
 
-        # iterate over all users
-        for i in range(num_users):
-            # calculate the index of the 'partner' creating a pseudo-circular linked list
-            partner = (i + 1) % num_users
-            # assign the partner to the current user
-            users[i].partner = users[partner].snowflake
+        constraints = constraints or PairingConstraints()
+        if avoid_previous:
+            constraints.previous_partners += [(user.snowflake, user.partner) for user in users if user.partner]
 
+        try:
+            partners = pair_participants([user.snowflake for user in users], constraints, seed=seed)
+        except PairingError as error:
+            logger.queue_message(f"Failed to pair users, no partners have been assigned: {error}", 'ERROR')
+            raise
+
+        assignments = [{'id': user.id, 'partner': partners[user.snowflake]} for user in users]
+
+        try:
+            # bulk update by primary key, sent as one executemany in a single transaction.
+            if assignments:
+                self.get_session().execute(update(User), assignments)
             self.get_session().commit()
+        except SQLAlchemyError:
+            self.get_session().rollback()
+            logger.queue_message(f"Failed to pair users, no partners have been assigned.", 'ERROR')
+            raise
+
+        logger.queue_message(f"Finished pairing {num_users} users.", 'INFO')
+        if num_users == 2:
+            logger.queue_message(f"Only 2 users are in event {event_id}, they are each other's partner.", 'WARNING')
+        # load every user's partner card now, before the reveal.
+        partner_cards.build(event_id)
+
+    def get_pairs(self, event_id, after=None, limit=None):
+        """
+        Get each unbanned user in an event and their 'partner' with a single self-join, ordered by snowflake.
+        :param event_id: id of the event.
+        :param after: (optional) only return users with a snowflake after this one (keyset pagination).
+        :param limit: (optional) maximum amount of pairs to return.
+        Returns:
+            (Query) rows of snowflake, username, partner_snowflake & partner_username.
+        """
+        partner = aliased(User)
+        query = (
+            self.get_session().query(
+                User.snowflake,
+                User.username,
+                partner.snowflake.label('partner_snowflake'),
+                partner.username.label('partner_username')
+            )
+            .join(partner, (partner.event_id == User.event_id) & (partner.snowflake == User.partner))
+            .filter(User.event_id == event_id, User.is_banned == False)
+            .order_by(User.snowflake)
+        )
 
-            logger.queue_message(f"{users[i].username} ({users[i].snowflake}) -> "
-                                 f"{users[partner].username} ({users[partner].snowflake})", 'INFO')
+        if after is not None:
+            query = query.filter(User.snowflake > after)
+        if limit is not None:
+            query = query.limit(limit)
 
-        logger.queue_message(f"Finished pairing users.", 'INFO')
+        return query
 
-    def create_artwork_entry(self, user, filename):
+    def get_artwork_export(self, event_id, since=None):
+        """
+        Get every artwork entry in an event with its creator and their 'partner', for exporting.
+        :param event_id: id of the event.
+        :param since: (optional) datetime, only return artwork uploaded or replaced at or after this time.
+        Returns:
+            (Query) rows of image_path, created_by, creator_username, partner_snowflake & partner_username.
+        """
+        creator = aliased(User)
+        partner = aliased(User)
+        query = (
+            self.get_session().query(
+                Artwork.image_path,
+                Artwork.created_by,
+                creator.username.label('creator_username'),
+                partner.snowflake.label('partner_snowflake'),
+                partner.username.label('partner_username')
+            )
+            .join(creator, (creator.event_id == Artwork.event_id) & (creator.snowflake == Artwork.created_by))
+            .outerjoin(partner, (partner.event_id == creator.event_id) & (partner.snowflake == creator.partner))
+            .filter(Artwork.event_id == event_id)
+            .order_by(Artwork.id)
+        )
+
+        if since is not None:
+            query = query.filter(Artwork.created_at >= since)
+
+        return query
+
+    def create_artwork_entry(self, user, filename, content_hash=None):
         """
         Function to add new artwork entry to artwork database table.
         :param user: the user who uploaded artwork.
-        :param filename: the generated filename of the uploaded artwork.
+        :param filename: the path of the uploaded artwork, relative to the upload folder.
+        :param content_hash: SHA-256 of the uploaded artwork.
+        Returns:
+            (Artwork) the new artwork entry.
         """
-        new_artwork = Artwork(created_by=user.snowflake, image_path=filename)
+        new_artwork = Artwork(created_by=user.snowflake, image_path=filename, event_id=user.event_id,
+                              content_hash=content_hash)
         self.get_session().add(new_artwork)
         self.get_session().commit()
+        return new_artwork
 
-    def update_existing_artwork(self, existing_artwork, filename):
+    def update_existing_artwork(self, existing_artwork, filename, content_hash=None):
         """
         Function to update an already populated artwork entry.
         :param existing_artwork: the artwork entry to update
-        :param filename: the generated filename of the updated file.
+        :param filename: the path of the updated file, relative to the upload folder.
+        :param content_hash: SHA-256 of the updated file.
         """
         existing_artwork.image_path = filename
+        existing_artwork.content_hash = content_hash
+        existing_artwork.thumbnail_path = None
         existing_artwork.created_at = datetime.now()
         self.get_session().commit()
+
+    def set_artwork_thumbnail(self, artwork_id, filename, thumbnail_path):
+        """
+        Record the thumbnail of an artwork entry, if it has not been replaced since the thumbnail was queued.
+        :param artwork_id: id of the artwork entry.
+        :param filename: filename of the artwork the thumbnail was generated from.
+        :param thumbnail_path: path of the thumbnail, relative to the upload folder.
+        Returns:
+            (bool) if the artwork entry was updated.
+        """
+        with self.app.app_context():
+            result = self.get_session().execute(
+                update(Artwork)
+                .where(Artwork.id == artwork_id, Artwork.image_path == filename)
+                .values(thumbnail_path=thumbnail_path)
+            )
+            self.get_session().commit()
+            return result.rowcount > 0
@@ -0,0 +1,132 @@
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from flask_discord import DiscordOAuth2Session, Unauthorized, RateLimited, configs
+from flask_discord.models import User, Guild
+from python.classes.metrics import metrics
+
+# Seconds before a token expires when it is left to flask_discord to refresh instead.
+TOKEN_REFRESH_MARGIN = 60
+
+class DiscordUnavailable(Exception):
+    """
+    Raised when discord doesn't respond within the timeout or can't be connected to.
+    """
+
+class DiscordClient:
+    """
+    Call the discord api for the logged-in user over a shared pool of keep-alive connections with timeouts.
+    flask_discord opens a new connection for every call and waits for discord forever, so a slow discord
+    ties up a worker per request. Tokens which need refreshing are still handled by flask_discord.
+    """
+    def __init__(self, pool_size=20, connect_timeout=3.05, read_timeout=10):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = None
+        self.lock = threading.Lock()
+
+    def configure(self, pool_size, connect_timeout, read_timeout):
+        """
+        Update the connection pool size & timeouts, closing any open connections.
+        :param pool_size: keep-alive connections to discord kept open.
+        :param connect_timeout: seconds to wait to connect to discord.
+        :param read_timeout: seconds to wait for discord to respond.
+        """
+        with self.lock:
+            if self.session is not None:
+                self.session.close()
+            self.session = None
+            self.pool_size = pool_size
+            self.timeout = (connect_timeout, read_timeout)
+
+    def after_fork(self):
+        """
+        Drop connections inherited from the parent process, so a forked worker opens its own.
+        """
+        self.lock = threading.Lock()
+        self.session = None
+
+    def get_session(self):
+        """
+        Returns:
+            (requests.Session) session pooling connections to discord, created on first use.
+        """
+        with self.lock:
+            if self.session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=False)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self.session = session
+            return self.session
+
+    @staticmethod
+    def access_token():
+        """
+        Get the logged-in user's access token, if it can be used without being refreshed.
+        Returns:
+            (str) the access token, or None if there isn't one or it is about to expire.
+        """
+        token = DiscordOAuth2Session.get_authorization_token()
+        if not token or not token.get('access_token'):
+            return None
+        expires_at = token.get('expires_at')
+        if expires_at is not None and expires_at - time.time() < TOKEN_REFRESH_MARGIN:
+            return None
+        return token['access_token']
+
+    def get(self, route, access_token):
+        """
+        Send a GET request to the discord api as the logged-in user.
+        :param route: api route e.g. '/users/@me'.
+        :param access_token: the user's access token.
+        Returns:
+            (dict or list) the json response.
+        """
+        started = time.perf_counter()
+        try:
+            response = self.get_session().get(
+                configs.DISCORD_API_BASE_URL + route,
+                headers={"Authorization": f"Bearer {access_token}"},
+                timeout=self.timeout
+            )
+        except (requests.Timeout, requests.ConnectionError) as error:
+            raise DiscordUnavailable(f"Discord didn't respond to {route}: {error}") from error
+        finally:
+            metrics.record_discord(route, time.perf_counter() - started)
+
+        if response.status_code == 401:
+            raise Unauthorized()
+        if response.status_code == 429:
+            payload = response.json()
+            payload.setdefault("message", "You are being rate limited.")
+            payload.setdefault("global", False)
+            payload.setdefault("retry_after", 1)
+            raise RateLimited(payload, response.headers)
+        if response.status_code >= 500:
+            raise DiscordUnavailable(f"Discord responded to {route} with {response.status_code}.")
+        return response.json()
+
+    def fetch_user(self):
+        """
+        Returns:
+            (flask_discord.User) the logged-in discord user.
+        """
+        access_token = self.access_token()
+        if access_token is None:
+            return current_app.discord.fetch_user()
+        return User(self.get(User.ROUTE, access_token))
+
+    def fetch_guilds(self):
+        """
+        Returns:
+            (list) flask_discord.Guild of every server the logged-in user is in.
+        """
+        access_token = self.access_token()
+        if access_token is None:
+            return current_app.discord.fetch_guilds()
+        return [Guild(payload) for payload in self.get(Guild.ROUTE, access_token)]
+
+discord_client = DiscordClient()
@@ -0,0 +1,138 @@
+import time
+from flask import g, request, has_app_context
+from sqlalchemy import select
+from python.classes.cache import TTLCache
+from python.classes.models.event import Event
+
+class EventNotFound(Exception):
+    """
+    Raised when a request chooses an event which doesn't exist or has been archived.
+    """
+
+class Events:
+    """
+    Look up which event a request is for, from '?event=<slug>' or the default event in config.yml.
+    Events are cached for a few seconds per worker, so choosing the event doesn't add a query to every request.
+    """
+    def __init__(self, default='default', ttl=2, max_size=256):
+        self.default = default
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.engine = None
+        # seconds until an event starts & its formatted countdown, from the last call to get_countdown.
+        self.countdown = (None, None)
+
+    def configure(self, default, ttl):
+        """
+        Update the default event & cache settings, clearing any cached events.
+        :param default: slug of the event used when a request doesn't choose one.
+        :param ttl: seconds an event is cached for, e.g. before a start in another worker is seen.
+        """
+        self.default = default
+        self.cache = TTLCache(max_size=self.cache.max_size, ttl=ttl)
+
+    def init_app(self, engine):
+        """
+        Look events up with their own short-lived connections, so long-running responses like
+        /event/stream don't hold a database connection open.
+        :param engine: the database engine.
+        """
+        self.engine = engine
+
+    def get(self, slug):
+        """
+        Get an event by its slug, only querying the database if it is not cached.
+        :param slug: slug of the event e.g. 'christmas-2023'.
+        Returns:
+            (Row) id, slug, name, server, start_time, is_started & is_archived of the event, or None.
+        """
+        event = self.cache.get(slug)
+        if event is not None:
+            return event
+
+        with self.engine.connect() as connection:
+            event = connection.execute(
+                select(Event.id, Event.slug, Event.name, Event.server, Event.start_time,
+                       Event.is_started, Event.is_archived)
+                .where(Event.slug == slug)
+            ).first()
+
+        if event is not None:
+            self.cache.set(slug, event)
+        return event
+
+    def current(self):
+        """
+        Get the event the current request is for, from '?event=<slug>' or the default event.
+        Returns:
+            (Row) the event, see get.
+        Raises:
+            EventNotFound: if the event doesn't exist or has been archived.
+        """
+        event = g.get('event')
+        if event is not None:
+            return event
+
+        slug = request.args.get('event') or self.default
+        event = self.get(slug)
+        if event is None:
+            raise EventNotFound(f"There isn't an event called '{slug}'.")
+        if event.is_archived:
+            raise EventNotFound(f"The '{slug}' event has been archived.")
+
+        g.event = event
+        return event
+
+    def invalidate(self, slug):
+        """
+        Remove an event from the cache after it has been changed (e.g. started).
+        :param slug: slug of the event.
+        """
+        self.cache.invalidate(slug)
+        if has_app_context() and g.get('event') is not None and g.event.slug == slug:
+            g.pop('event')
+
+    @staticmethod
+    def seconds_until_start(event):
+        """
+        :param event: the event.
+        Returns:
+            (int) seconds until the event's start time, or 0 if it has passed or isn't set.
+        """
+        if event.start_time is None:
+            return 0
+        return max(event.start_time - int(time.time()), 0)
+
+    def get_countdown(self, event):
+        """
+        Gets a Days, Hours, Minutes, Seconds countdown from the event's start time.
+        The countdown is only formatted once a second, however many requests ask for it.
+        :param event: the event.
+        Returns:
+            (str) Formatted string of the countdown until the event starts.
+        """
+        time_difference = self.seconds_until_start(event)
+        cached_difference, countdown = self.countdown
+        if cached_difference == time_difference:
+            return countdown
+
+        remaining = time_difference
+        days = time_difference // (24 * 3600)
+        time_difference %= (24 * 3600)
+        hours = time_difference // 3600
+        time_difference %= 3600
+        minutes = time_difference // 60
+        seconds = time_difference % 60
+
+        countdown = f"{days} days, {hours} hours, {minutes} minutes, {seconds} seconds"
+        self.countdown = (remaining, countdown)
+        return countdown
+
+    def stats(self) -> dict:
+        """
+        Get the hit / miss counters of the event cache.
+        Returns:
+            (dict) cache counters.
+        """
+        return self.cache.stats()
+
+events = Events()
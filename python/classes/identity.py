@@ -0,0 +1,73 @@
+from flask import g
+from flask_discord import DiscordOAuth2Session
+from python.classes.cache import TTLCache
+from python.classes.discord_client import discord_client
+
+class Identity:
+    """
+    Fetch the logged-in discord user at most once per request, and optionally share them across
+    requests with a TTL cache keyed by the user's OAuth token.
+    """
+    def __init__(self, ttl=60, max_size=1024):
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def configure(self, ttl, max_size):
+        """
+        Update the cross-request cache settings, clearing any cached users.
+        :param ttl: seconds a user is cached for, 0 only caches for the current request.
+        :param max_size: maximum amount of cached users.
+        """
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    @staticmethod
+    def token_key():
+        """
+        Get the OAuth access token of the current session to use as a cache key.
+        Returns:
+            (str) the access token, or None if the user has not logged in.
+        """
+        token = DiscordOAuth2Session.get_authorization_token()
+        if token:
+            return token.get('access_token')
+        return None
+
+    def fetch_user(self):
+        """
+        Get the logged-in discord user, only calling discord if they are not cached.
+        Returns:
+            (flask_discord.User) the logged-in discord user.
+        """
+        user = g.get('discord_user')
+        if user is not None:
+            return user
+
+        key = self.token_key()
+        if key is not None:
+            user = self.cache.get(key)
+
+        if user is None:
+            user = discord_client.fetch_user()
+            if key is not None:
+                self.cache.set(key, user)
+
+        g.discord_user = user
+        return user
+
+    def invalidate(self):
+        """
+        Remove the logged-in user from the cache (e.g. when they log out).
+        """
+        key = self.token_key()
+        if key is not None:
+            self.cache.invalidate(key)
+        g.pop('discord_user', None)
+
+    def stats(self) -> dict:
+        """
+        Get the hit / miss counters of the cross-request cache.
+        Returns:
+            (dict) cache counters.
+        """
+        return self.cache.stats()
+
+identity = Identity()
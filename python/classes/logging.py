@@ -1,5 +1,9 @@
+import os
+import sys
+import json
 import queue
 import time
+import atexit
 import threading
 from datetime import datetime
 
@@ -12,6 +16,11 @@ class Text:
     YELLOW = "\033[93m"
     PURPLE = "\033[35m"
 
+# What to do with new log messages when the queue is full.
+OVERFLOW_POLICIES = {"block", "drop-oldest", "sample"}
+# Queued to wake the processing thread when it is stopped.
+STOP = None
+
 class Logging:
     _instance = None
 
@@ -26,69 +35,300 @@ class Logging:
         if self.__initialized:
             return
         self.__initialized = True
-        self.response_queue = queue.Queue()
+        self.response_queue = queue.Queue(maxsize=10000)
+        self.overflow = "drop-oldest"
+        self.sample_rate = 10
+        self.json_lines = False
+        self.flush_interval = 1.0
+        self.flush_size = 500
+        self.stream = sys.stdout
+        self.binary = False
+        self.show_pid = False
+        self.write_lock = threading.Lock()
+        self.counter_lock = threading.Lock()
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.overflowed = 0
+        self.processing_thread = None
+        self.stopping = False
+        self.exit_registered = False
+
+    def configure(self, max_queue_size=10000, overflow="drop-oldest", sample_rate=10, json_lines=False,
+                  flush_interval=1.0, flush_size=500, stream=None, file=None, show_pid=False):
+        """
+        Configure the message queue and how messages are written, any queued messages are kept.
+        Args: max_queue_size (int): maximum amount of messages waiting to be written.
+              overflow (str): when the queue is full either 'block' the caller, 'drop-oldest' message or
+                              'sample' new messages, keeping one in every sample_rate.
+              sample_rate (int): keep one in this many messages when sampling.
+              json_lines (bool): write messages as JSON objects, one per line, instead of coloured text.
+              flush_interval (float): maximum seconds a message waits before being written.
+              flush_size (int): write as soon as this many messages are waiting.
+              stream (file): where messages are written, defaults to stdout.
+              file (str): path of a file to append messages to instead of the stream. Every batch is added
+                          with a single write to a file opened with O_APPEND, so many worker processes can
+                          share one log file without their lines being interleaved.
+              show_pid (bool): add the process id to each text message, json lines always include it.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log overflow policy '{overflow}', use one of: {', '.join(OVERFLOW_POLICIES)}")
+
+        new_queue = queue.Queue(maxsize=max_queue_size)
+        while True:
+            try:
+                record = self.response_queue.get_nowait()
+            except queue.Empty:
+                break
+            if not new_queue.full():
+                new_queue.put_nowait(record)
+
+        self.response_queue = new_queue
+        self.overflow = overflow
+        self.sample_rate = max(int(sample_rate), 1)
+        self.json_lines = json_lines
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.show_pid = show_pid
+        if file:
+            # unbuffered, so each batch is exactly one write.
+            self.stream = open(file, "ab", buffering=0)
+            self.binary = True
+        else:
+            self.stream = stream or sys.stdout
+            self.binary = False
 
-    def formatted_time(self):
+    def formatted_time(self, timestamp=None):
         """
-        Get the current formatted timestamp in the format: "dd/mm/YYYY - HH:MM:SS".
+        Get the current (or given) formatted timestamp in the format: "dd/mm/YYYY - HH:MM:SS".
         """
-        return datetime.fromtimestamp(time.time()).strftime("%d/%m/%Y - %H:%M:%S")
+        return datetime.fromtimestamp(timestamp or time.time()).strftime("%d/%m/%Y - %H:%M:%S")
 
-    def info_message(self, message):
+    def info_message(self, message, timestamp=None):
         """
         Format an INFO log message with a timestamp.
         Args: message (str): The message to be logged.
         Returns: formatted log message. (str)
         """
-        return f"{Text.CYAN}{Text.BOLD}[{self.formatted_time()} INFO]: {Text.END}{message}"
+        return f"{Text.CYAN}{Text.BOLD}[{self.formatted_time(timestamp)} INFO]: {Text.END}{message}"
 
-    def created_message(self, message):
+    def created_message(self, message, timestamp=None):
         """
         Format an CREATED log message with a timestamp.
         Args: message (str): The message to be logged.
         Returns: formatted log message. (str)
         """
-        return f"{Text.YELLOW}{Text.BOLD}[{self.formatted_time()} CREATED]: {Text.END}{message}"
+        return f"{Text.YELLOW}{Text.BOLD}[{self.formatted_time(timestamp)} CREATED]: {Text.END}{message}"
+
+    def warning_message(self, message, timestamp=None):
+        """
+        Format an WARNING log message with a timestamp.
+        Args: message (str): The message to be logged.
+        Returns: formatted log message. (str)
+        """
+        return f"{Text.PURPLE}{Text.BOLD}[{self.formatted_time(timestamp)} WARNING]: {Text.END}{message}"
 
-    def error_message(self, message):
+    def error_message(self, message, timestamp=None):
         """
         Format an ERROR log message with a timestamp.
         Args: message (str): The message to be logged.
         Returns: formatted log message. (str)
         """
-        return f"{Text.RED}{Text.BOLD}[{self.formatted_time()} ERROR]: {Text.END}{message}"
+        return f"{Text.RED}{Text.BOLD}[{self.formatted_time(timestamp)} ERROR]: {Text.END}{message}"
 
-    def queue_message(self, message, message_type):
+    def format_record(self, record):
         """
-        Format and enqueue a log message based on its type.
-        Args: message (str): The log message to be formatted and enqueued.
-              message_type (str): Type of the log message, either 'INFO' or 'ERROR'.
+        Format a queued log record as a line of text or JSON.
+        Args: record (tuple): timestamp, message type, message and process id.
+        Returns: formatted log line ending in a newline. (str)
         """
-        response_message = None
-        if message_type == 'INFO':
-            response_message = self.info_message(message)
-        elif message_type == 'ERROR':
-            response_message = self.error_message(message)
+        timestamp, message_type, message, pid = record
+        if self.json_lines:
+            return json.dumps({
+                "time": datetime.fromtimestamp(timestamp).isoformat(),
+                "type": message_type,
+                "message": message,
+                "pid": pid
+            }) + "\n"
+
+        if self.show_pid:
+            message = f"[{pid}] {message}"
+
+        if message_type == 'ERROR':
+            return self.error_message(message, timestamp) + "\n"
         elif message_type == 'CREATED':
-            response_message = self.created_message(message)
-        self.response_queue.put(response_message)
+            return self.created_message(message, timestamp) + "\n"
+        elif message_type == 'WARNING':
+            return self.warning_message(message, timestamp) + "\n"
+        return self.info_message(message, timestamp) + "\n"
 
-    def process_queue(self):
+    def queue_message(self, message, message_type):
         """
-        get log messages from the queue and print them with a 5-second delay.
+        Enqueue a log message to be formatted and written by the processing thread.
+        Args: message (str): The log message to be enqueued.
+              message_type (str): Type of the log message, either 'INFO', 'CREATED', 'WARNING' or 'ERROR'.
         """
-        while True:
+        record = (time.time(), message_type, message, os.getpid())
+
+        if self.overflow == "block":
+            self.response_queue.put(record)
+            self.count(queued=1)
+            return
+
+        try:
+            self.response_queue.put_nowait(record)
+            self.count(queued=1)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow == "sample":
+            with self.counter_lock:
+                self.overflowed += 1
+                keep = self.overflowed % self.sample_rate == 0
+            if not keep:
+                self.count(dropped=1)
+                return
+
+        # make room by dropping the oldest message.
+        try:
+            self.response_queue.get_nowait()
+            self.count(dropped=1)
+        except queue.Empty:
+            pass
+
+        try:
+            self.response_queue.put_nowait(record)
+            self.count(queued=1)
+        except queue.Full:
+            self.count(dropped=1)
+
+    def count(self, queued=0, dropped=0, written=0):
+        """
+        Update the message counters.
+        """
+        with self.counter_lock:
+            self.queued += queued
+            self.dropped += dropped
+            self.written += written
+
+    def stats(self):
+        """
+        Get counters of queued, dropped & written messages and the amount currently waiting.
+        Returns: message counters. (dict)
+        """
+        with self.counter_lock:
+            return {
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "waiting": self.response_queue.qsize(),
+            }
+
+    def drain(self, limit):
+        """
+        Get up to limit messages which are already waiting in the queue, without blocking.
+        Returns: list of log records. (list)
+        """
+        records = []
+        while len(records) < limit:
             try:
-                message = self.response_queue.get()
-                print(message)
-                time.sleep(5)
+                record = self.response_queue.get_nowait()
             except queue.Empty:
                 break
+            if record is not STOP:
+                records.append(record)
+        return records
+
+    def write(self, records):
+        """
+        Format log records and write them to the stream with a single write.
+        """
+        if not records:
+            return
+
+        data = "".join(self.format_record(record) for record in records)
+        with self.write_lock:
+            self.stream.write(data.encode() if self.binary else data)
+            self.stream.flush()
+        self.count(written=len(records))
+
+    def flush(self):
+        """
+        Write every message currently waiting in the queue.
+        """
+        while True:
+            records = self.drain(self.flush_size)
+            if not records:
+                break
+            self.write(records)
+
+    def process_queue(self):
+        """
+        get log messages from the queue and write them in batches, once flush_size messages are waiting
+        or the oldest message has waited flush_interval seconds. Returns once stop() has been called.
+        """
+        while not self.stopping:
+            try:
+                record = self.response_queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if record is STOP:
+                continue
+
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_size and not self.stopping:
+                batch.extend(self.drain(self.flush_size - len(batch)))
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.flush_size or remaining <= 0:
+                    break
+                try:
+                    record = self.response_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is not STOP:
+                    batch.append(record)
+
+            self.write(batch)
 
     def start_processing_thread(self):
         """
         Start a separate thread to process log messages from the queue.
         """
-        processing_thread = threading.Thread(target=self.process_queue)
-        processing_thread.daemon = True
-        processing_thread.start()
\ No newline at end of file
+        self.stopping = False
+        self.processing_thread = threading.Thread(target=self.process_queue)
+        self.processing_thread.daemon = True
+        self.processing_thread.start()
+        # write any messages still waiting when the app exits.
+        if not self.exit_registered:
+            atexit.register(self.stop)
+            self.exit_registered = True
+
+    def stop(self, timeout=5):
+        """
+        Stop the processing thread once it has written the batch it is collecting, then write
+        any messages still waiting in the queue.
+        """
+        thread = self.processing_thread
+        if thread is not None and thread.is_alive():
+            self.stopping = True
+            try:
+                self.response_queue.put_nowait(STOP)
+            except queue.Full:
+                # the thread isn't waiting for messages if the queue is full.
+                pass
+            thread.join(timeout)
+        self.processing_thread = None
+        self.flush()
+
+    def after_fork(self):
+        """
+        Restart message processing in a forked worker process, as threads & locks aren't copied safely
+        into the new process. Messages queued before the fork are left for the parent process to write.
+        """
+        self.response_queue = queue.Queue(maxsize=self.response_queue.maxsize)
+        self.write_lock = threading.Lock()
+        self.counter_lock = threading.Lock()
+        self.show_pid = True
+        self.start_processing_thread()
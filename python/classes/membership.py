@@ -0,0 +1,94 @@
+import threading
+from python.classes.cache import TTLCache
+from python.classes.discord_client import discord_client
+
+class Membership:
+    """
+    Check if a discord user is in the skrapbuk server, caching the result by snowflake so repeated
+    calls to /users/me and /users/join don't download the user's guild list every time.
+    """
+    def __init__(self, ttl=300, negative_ttl=30, max_size=4096, wait_timeout=10):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.wait_timeout = wait_timeout
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def configure(self, ttl, negative_ttl, max_size):
+        """
+        Update the cache settings, clearing any cached memberships.
+        :param ttl: seconds a member is cached for.
+        :param negative_ttl: seconds a non-member is cached for (shorter, so users who join are seen quickly).
+        :param max_size: maximum amount of cached users.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def is_member(self, snowflake, server) -> bool:
+        """
+        Check if a user is in a discord server, only one lookup per user is sent to discord at a time,
+        concurrent requests for the same user wait for and share its result.
+        :param snowflake: discord snowflake of the logged-in user.
+        :param server: id of the discord server.
+        Returns:
+            (bool) if the user is in the server.
+        """
+        key = (snowflake, server)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self.lock:
+            in_flight = self.pending.get(key)
+            if in_flight is None:
+                in_flight = self.pending[key] = threading.Event()
+                is_leader = True
+            else:
+                is_leader = False
+
+        if not is_leader:
+            in_flight.wait(self.wait_timeout)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            # the other lookup failed or timed out, look it up for this request instead.
+            return self.fetch(key, server)
+
+        try:
+            return self.fetch(key, server)
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+            in_flight.set()
+
+    def fetch(self, key, server) -> bool:
+        """
+        Get the logged-in user's guilds from discord and cache if they are in the server.
+        :param key: cache key of the user.
+        :param server: id of the discord server.
+        Returns:
+            (bool) if the user is in the server.
+        """
+        is_member = any(guild.id == server for guild in discord_client.fetch_guilds())
+        self.cache.set(key, is_member, ttl=self.ttl if is_member else self.negative_ttl)
+        return is_member
+
+    def invalidate(self, snowflake, server):
+        """
+        Remove a user's cached membership.
+        :param snowflake: discord snowflake of the user.
+        :param server: id of the discord server.
+        """
+        self.cache.invalidate((snowflake, server))
+
+    def stats(self) -> dict:
+        """
+        Get the hit / miss counters of the membership cache.
+        Returns:
+            (dict) cache counters.
+        """
+        return self.cache.stats()
+
+membership = Membership()
@@ -0,0 +1,245 @@
+import time
+import threading
+from collections import defaultdict
+from functools import wraps
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from python.classes.logging import Logging
+
+# Upper bounds (seconds) of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the SQL statements per request histogram buckets.
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 50, 100)
+# Endpoint label of SQL statements & discord calls made outside a request e.g. by thumbnail callbacks.
+BACKGROUND_ENDPOINT = "background"
+# Endpoint label of requests which didn't match a route, so unknown urls don't each create a new label.
+UNMATCHED_ENDPOINT = "unmatched"
+
+logger = Logging()
+
+class Histogram:
+    """
+    Cumulative histogram of observed values, in the same shape as a Prometheus histogram.
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+def escape_label(value) -> str:
+    """
+    Escape a label value for the Prometheus text format.
+    """
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(labels) -> str:
+    """
+    Format label names & values e.g. {endpoint="users_blueprint.join",method="GET"}.
+    :param labels: tuple of (name, value) pairs.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels) + "}"
+
+def format_number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+class Metrics:
+    """
+    Record the latency, SQL statements & discord api calls of every request, grouped by flask endpoint,
+    and expose them in the Prometheus text format. Metrics are kept in memory for this process only.
+    """
+    def __init__(self, query_budget=20):
+        self.query_budget = query_budget
+        self.lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.statements_per_request = defaultdict(lambda: Histogram(STATEMENT_BUCKETS))
+        self.requests = defaultdict(int)
+        self.statements = defaultdict(int)
+        self.database_time = defaultdict(float)
+        self.over_budget = defaultdict(int)
+        self.discord_requests = defaultdict(int)
+        self.discord_time = defaultdict(float)
+        self.stats_collectors = []
+
+    def configure(self, query_budget):
+        """
+        Update the query budget.
+        :param query_budget: SQL statements a request can make before a warning is logged, 0 disables it.
+        """
+        self.query_budget = query_budget
+
+    def init_app(self, app, engine, discord):
+        """
+        Start recording requests made to the app, statements run on the engine & calls made by discord.
+        :param app: the flask app.
+        :param engine: the SQLAlchemy engine.
+        :param discord: the app's DiscordOAuth2Session.
+        """
+        app.before_request(self.start_request)
+        app.after_request(self.record_status)
+        # teardown runs after streamed responses have finished, so their queries are included.
+        app.teardown_request(self.finish_request)
+
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+
+        discord.request = self.count_discord(discord.request, lambda route, *args, **kwargs: route)
+        discord._fetch_token = self.count_discord(discord._fetch_token, lambda *args, **kwargs: "/oauth2/token")
+
+    def add_stats(self, name, description, stats):
+        """
+        Expose the counters of a component (e.g. a cache's stats()) as a gauge.
+        :param name: metric name e.g. 'skrapbuk_identity_cache'.
+        :param description: help text of the metric.
+        :param stats: function returning a dict of counter names & values.
+        """
+        self.stats_collectors.append((name, description, stats))
+
+    @staticmethod
+    def endpoint():
+        """
+        Returns:
+            (str) endpoint label of the current request.
+        """
+        if not has_request_context():
+            return BACKGROUND_ENDPOINT
+        return request.endpoint or UNMATCHED_ENDPOINT
+
+    def start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_statements = 0
+        g.metrics_database_time = 0.0
+        g.metrics_status = 500
+
+    @staticmethod
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    def finish_request(self, error=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+
+        elapsed = time.perf_counter() - started
+        endpoint = self.endpoint()
+        statements = g.get('metrics_statements', 0)
+
+        with self.lock:
+            self.latency[endpoint].observe(elapsed)
+            self.statements_per_request[endpoint].observe(statements)
+            self.requests[(endpoint, request.method, g.get('metrics_status', 500))] += 1
+            over_budget = 0 < self.query_budget < statements
+            if over_budget:
+                self.over_budget[endpoint] += 1
+
+        if over_budget:
+            logger.queue_message(
+                f"{request.method} {request.path} ({endpoint}) made {statements} SQL statements "
+                f"({g.get('metrics_database_time', 0.0) * 1000:.1f}ms), over the budget of {self.query_budget}.",
+                'WARNING'
+            )
+
+    @staticmethod
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_started'].pop()
+        endpoint = self.endpoint()
+
+        if has_request_context() and 'metrics_statements' in g:
+            g.metrics_statements += 1
+            g.metrics_database_time += elapsed
+
+        with self.lock:
+            self.statements[endpoint] += 1
+            self.database_time[endpoint] += elapsed
+
+    def count_discord(self, func, route):
+        """
+        Wrap a function calling the discord api to count its calls and time spent waiting for discord.
+        :param func: the function to wrap.
+        :param route: function returning the route label from the arguments of func.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record_discord(route(*args, **kwargs), time.perf_counter() - started)
+        return wrapper
+
+    def record_discord(self, route, elapsed):
+        """
+        Record a call made to the discord api.
+        :param route: the api route e.g. '/users/@me'.
+        :param elapsed: seconds the call took.
+        """
+        key = (self.endpoint(), route)
+        with self.lock:
+            self.discord_requests[key] += 1
+            self.discord_time[key] += elapsed
+
+    def render(self) -> str:
+        """
+        Returns:
+            (str) every metric in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name, kind, description, samples):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{format_labels(labels)} {format_number(value)}")
+
+        def histogram_samples(histograms):
+            for endpoint, histogram in sorted(histograms.items()):
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts + [histogram.count]):
+                    yield "_bucket", (("endpoint", endpoint), ("le", format_number(float(bound)))), count
+                yield "_sum", (("endpoint", endpoint),), histogram.sum
+                yield "_count", (("endpoint", endpoint),), histogram.count
+
+        with self.lock:
+            metric("skrapbuk_request_duration_seconds", "histogram", "Time taken to respond to requests.",
+                   list(histogram_samples(self.latency)))
+            metric("skrapbuk_requests_total", "counter", "Requests by endpoint, method & status code.",
+                   [("", (("endpoint", endpoint), ("method", method), ("status", status)), count)
+                    for (endpoint, method, status), count in sorted(self.requests.items())])
+            metric("skrapbuk_request_sql_statements", "histogram", "SQL statements made by each request.",
+                   list(histogram_samples(self.statements_per_request)))
+            metric("skrapbuk_sql_statements_total", "counter", "SQL statements by endpoint.",
+                   [("", (("endpoint", endpoint),), count) for endpoint, count in sorted(self.statements.items())])
+            metric("skrapbuk_sql_seconds_total", "counter", "Time spent running SQL statements by endpoint.",
+                   [("", (("endpoint", endpoint),), seconds)
+                    for endpoint, seconds in sorted(self.database_time.items())])
+            metric("skrapbuk_query_budget_exceeded_total", "counter",
+                   f"Requests making more than {self.query_budget} SQL statements.",
+                   [("", (("endpoint", endpoint),), count) for endpoint, count in sorted(self.over_budget.items())])
+            metric("skrapbuk_discord_requests_total", "counter", "Calls to the discord api by endpoint & route.",
+                   [("", (("endpoint", endpoint), ("route", route)), count)
+                    for (endpoint, route), count in sorted(self.discord_requests.items())])
+            metric("skrapbuk_discord_seconds_total", "counter", "Time spent waiting for the discord api.",
+                   [("", (("endpoint", endpoint), ("route", route)), seconds)
+                    for (endpoint, route), seconds in sorted(self.discord_time.items())])
+
+        for name, description, stats in self.stats_collectors:
+            metric(name, "gauge", description,
+                   [("", (("counter", counter),), value) for counter, value in sorted(stats().items())])
+
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
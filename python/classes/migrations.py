@@ -0,0 +1,349 @@
+from sqlalchemy import Table, MetaData, Column, Integer, String, TIMESTAMP, select, insert, update, inspect, text, func
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.schema import CreateTable, AddConstraint
+from sqlalchemy.exc import IntegrityError
+from python.classes.database import database
+from python.classes.models.event import Event
+from python.classes.models.user import User
+from python.classes.models.answers import Answers
+from python.classes.models.artwork import Artwork
+from python.classes.models.ban_list import BanList, BanVersion
+from python.classes.models.archive import ARCHIVE_TABLES
+
+# Records which migrations have been applied to the database.
+schema_version = Table(
+    'schema_version',
+    database.metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(255)),
+    Column('applied_at', TIMESTAMP, server_default=func.now())
+)
+
+MIGRATIONS = []
+
+class MigrationError(Exception):
+    pass
+
+def migration(version, name):
+    """
+    Decorator function to register a migration, migrations are applied in order of version. Each migration
+    checks the current schema before changing it, so it is safe to run on a database created by create_all.
+    Migrations are called with a connection, an inspector & the Migrations being run.
+    :param version: unique version number of the migration.
+    :param name: short description of the migration.
+    """
+    def register(func):
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+def index_names(inspector, table):
+    """
+    Get the names of every index & unique constraint on a table.
+    """
+    names = {index['name'] for index in inspector.get_indexes(table)}
+    names.update(constraint['name'] for constraint in inspector.get_unique_constraints(table))
+    return names
+
+def create_unique_index(connection, inspector, table, name, column):
+    """
+    Create a unique index if it doesn't exist, failing with the duplicated values if there are any.
+    :param connection: database connection.
+    :param inspector: inspector of the connection.
+    :param table: the model's Table.
+    :param name: name of the index, as declared on the model.
+    :param column: name of the indexed column.
+    """
+    if name in index_names(inspector, table.name):
+        return
+
+    indexed_column = table.c[column]
+    duplicates = connection.execute(
+        select(indexed_column).where(indexed_column.isnot(None))
+        .group_by(indexed_column).having(func.count() > 1).limit(10)
+    ).scalars().all()
+    if duplicates:
+        raise MigrationError(f"Can't add unique index {name}, {table.name}.{column} "
+                             f"has duplicate values: {', '.join(map(str, duplicates))}")
+
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(text(f"CREATE UNIQUE INDEX {quote(name)} ON {quote(table.name)} ({quote(column)})"))
+
+@migration(1, "add partner foreign key")
+def add_partner_foreign_key(connection, inspector, migrations):
+    # previously added by Database.create_all, new tables get it from the User model.
+    # other databases can't add foreign keys to existing tables.
+    if connection.dialect.name != 'mysql':
+        return
+
+    foreign_keys = {foreign_key['name'] for foreign_key in inspector.get_foreign_keys('user')}
+    if 'fk_user_partner' not in foreign_keys:
+        connection.execute(text(
+            'ALTER TABLE user ADD CONSTRAINT fk_user_partner FOREIGN KEY (partner) REFERENCES user(snowflake)'
+        ))
+
+@migration(2, "add artwork thumbnail column")
+def add_artwork_thumbnail_column(connection, inspector, migrations):
+    columns = {column['name'] for column in inspector.get_columns('artwork')}
+    if 'thumbnail_path' not in columns:
+        connection.execute(text('ALTER TABLE artwork ADD COLUMN thumbnail_path VARCHAR(255) NULL'))
+
+@migration(3, "add unique lookup indexes")
+def add_lookup_indexes(connection, inspector, migrations):
+    # tables created with an event_id column already have per-event unique indexes instead.
+    if 'event_id' in {column['name'] for column in inspector.get_columns('user')}:
+        return
+
+    create_unique_index(connection, inspector, User.__table__, 'uq_user_snowflake', 'snowflake')
+    create_unique_index(connection, inspector, Answers.__table__, 'uq_answers_user_snowflake', 'user_snowflake')
+    create_unique_index(connection, inspector, Artwork.__table__, 'uq_artwork_created_by', 'created_by')
+    create_unique_index(connection, inspector, BanList.__table__, 'uq_ban_list_user_snowflake', 'user_snowflake')
+
+    # the old non-unique index on user.snowflake is covered by the unique index.
+    if 'ix_user_snowflake' in index_names(inspect(connection), 'user'):
+        connection.execute(text('DROP INDEX ix_user_snowflake ON user') if connection.dialect.name == 'mysql'
+                           else text('DROP INDEX ix_user_snowflake'))
+
+def rebuild_sqlite_table(connection, table, event_id):
+    """
+    Recreate a SQLite table from its model, copying its rows across into the default event. SQLite can't
+    add foreign keys or change constraints of an existing table, so this follows its documented steps:
+    create the new table, copy the rows, drop the old table & rename the new one into its place.
+    :param connection: database connection, with foreign key checks turned off.
+    :param table: the model's Table.
+    :param event_id: id of the event the existing rows belong to.
+    """
+    # copy every table into a new metadata, so the new table's foreign keys can still be resolved.
+    metadata = MetaData()
+    for model_table in database.metadata.tables.values():
+        model_table.to_metadata(metadata)
+    new_table = table.to_metadata(metadata, name=f"{table.name}_new")
+
+    old_columns = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    columns = [column.name for column in table.columns if column.name in old_columns]
+
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(CreateTable(new_table))
+    connection.execute(text(
+        f"INSERT INTO {quote(new_table.name)} ({', '.join(map(quote, columns))}, event_id) "
+        f"SELECT {', '.join(map(quote, columns))}, :event_id FROM {quote(table.name)}"
+    ), {"event_id": event_id})
+    connection.execute(text(f"DROP TABLE {quote(table.name)}"))
+    connection.execute(text(f"ALTER TABLE {quote(new_table.name)} RENAME TO {quote(table.name)}"))
+    for index in table.indexes:
+        index.create(connection)
+
+def alter_mysql_table(connection, table, event_id):
+    """
+    Add the event_id column to a MySQL table, moving its rows into the default event, and replace its
+    unique indexes & foreign keys on snowflakes with the per-event ones from its model.
+    Foreign keys referencing user.snowflake must already have been dropped.
+    :param connection: database connection.
+    :param table: the model's Table.
+    :param event_id: id of the event the existing rows belong to.
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN event_id INTEGER NULL"))
+    connection.execute(update(table).values(event_id=event_id))
+    connection.execute(text(f"ALTER TABLE {quote(table.name)} MODIFY event_id INTEGER NOT NULL"))
+
+    inspector = inspect(connection)
+    old_indexes = {index['name'] for index in inspector.get_indexes(table.name) if index['unique']}
+    for name in old_indexes - {index.name for index in table.indexes}:
+        connection.execute(text(f"DROP INDEX {quote(name)} ON {quote(table.name)}"))
+
+    existing = index_names(inspector, table.name)
+    columns = {column['name'] for column in inspector.get_columns(table.name)}
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.name not in existing:
+            connection.execute(AddConstraint(constraint))
+    for index in table.indexes:
+        # indexes on columns added by later migrations are created by them.
+        if index.name not in existing and all(column.name in columns for column in index.columns):
+            index.create(connection)
+    for constraint in table.foreign_key_constraints:
+        connection.execute(AddConstraint(constraint))
+
+@migration(4, "add events")
+def add_events(connection, inspector, migrations):
+    Event.__table__.create(connection, checkfirst=True)
+    for archive in ARCHIVE_TABLES.values():
+        archive.create(connection, checkfirst=True)
+
+    # existing rows & new deployments start with the default event from config.yml.
+    event_id = connection.execute(select(Event.id).order_by(Event.id).limit(1)).scalar()
+    if event_id is None:
+        default_event = migrations.default_event or {'slug': 'default', 'name': 'default'}
+        event_id = connection.execute(insert(Event).values(
+            slug=default_event['slug'],
+            name=default_event.get('name'),
+            server=default_event.get('server'),
+            start_time=default_event.get('start_time'),
+            is_started=default_event.get('is_started', False),
+            is_archived=False
+        )).inserted_primary_key[0]
+
+    # tables which already have event_id were created by create_all with the per-event schema.
+    tables = [table for table in (User.__table__, Answers.__table__, Artwork.__table__, BanList.__table__)
+              if 'event_id' not in {column['name'] for column in inspector.get_columns(table.name)}]
+    if not tables:
+        return
+
+    if connection.dialect.name == 'sqlite':
+        for table in tables:
+            rebuild_sqlite_table(connection, table, event_id)
+        return
+
+    # drop foreign keys on user.snowflake first, as its unique index is replaced by (event_id, snowflake).
+    quote = connection.dialect.identifier_preparer.quote
+    for table in tables:
+        for foreign_key in inspector.get_foreign_keys(table.name):
+            if foreign_key['referred_table'] == 'user':
+                connection.execute(text(f"ALTER TABLE {quote(table.name)} "
+                                        f"DROP FOREIGN KEY {quote(foreign_key['name'])}"))
+    # add user's new unique constraint before the other tables' foreign keys reference it.
+    for table in sorted(tables, key=lambda table: table is not User.__table__):
+        alter_mysql_table(connection, table, event_id)
+
+@migration(5, "add artwork content hash")
+def add_artwork_content_hash(connection, inspector, migrations):
+    # archived artwork is counted too before a file is removed, so it needs the column & index as well.
+    for table in (Artwork.__table__, ARCHIVE_TABLES[Artwork.__table__]):
+        if 'content_hash' not in {column['name'] for column in inspector.get_columns(table.name)}:
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN content_hash VARCHAR(64) NULL'))
+        existing = index_names(inspector, table.name)
+        for index in table.indexes:
+            if 'content_hash' in index.columns and index.name not in existing:
+                index.create(connection)
+
+@migration(6, "add ban version")
+def add_ban_version(connection, inspector, migrations):
+    # replaces the (count, max id) fingerprint of ban_list, which can repeat after an unban & a ban.
+    BanVersion.__table__.create(connection, checkfirst=True)
+    if connection.execute(select(BanVersion.id)).first() is None:
+        connection.execute(insert(BanVersion).values(id=1, version=0))
+
+# Queries run on (almost) every request, which must use an index rather than scanning the whole table.
+HOT_QUERIES = {
+    "user by snowflake": select(User.id).where(User.event_id == 0, User.snowflake == '0'),
+    "users of an event": select(User.id).where(User.event_id == 0, User.id > 0).order_by(User.id),
+    "answers by user_snowflake": select(Answers.id).where(Answers.event_id == 0, Answers.user_snowflake == '0'),
+    "artwork by created_by": select(Artwork.id).where(Artwork.event_id == 0, Artwork.created_by == '0'),
+    "artwork by content_hash": select(Artwork.id).where(Artwork.content_hash == '0', Artwork.image_path == '0'),
+    "ban_list by user_snowflake": select(BanList.id).where(BanList.event_id == 0, BanList.user_snowflake == '0'),
+    "event by slug": select(Event.id).where(Event.slug == 'default'),
+}
+
+class Migrations:
+    def __init__(self, engine, logger, default_event=None):
+        self.engine = engine
+        self.logger = logger
+        # slug, name, server, start_time & is_started of the event existing rows are moved into.
+        self.default_event = default_event
+
+    def applied_versions(self):
+        """
+        Returns:
+            (set) versions of every migration applied to the database.
+        """
+        with self.engine.connect() as connection:
+            return set(connection.execute(select(schema_version.c.version)).scalars())
+
+    def run(self):
+        """
+        Apply every migration which hasn't been applied yet, in order. Running this again does nothing.
+        Returns:
+            (list) versions of the migrations which were applied.
+        """
+        schema_version.create(self.engine, checkfirst=True)
+        applied = self.applied_versions()
+        newly_applied = []
+
+        for version, name, func in MIGRATIONS:
+            if version in applied:
+                continue
+
+            try:
+                with self.engine.connect() as connection:
+                    self.apply(connection, version, name, func)
+            except IntegrityError:
+                # another process applied this migration at the same time.
+                continue
+
+            newly_applied.append(version)
+            self.logger.queue_message(f"Applied database migration {version}: {name}.", 'CREATED')
+
+        return newly_applied
+
+    def apply(self, connection, version, name, func):
+        """
+        Apply a single migration in a transaction. SQLite's foreign key checks are turned off while it runs,
+        so tables can be rebuilt, and every foreign key is checked before the migration is committed.
+        :param connection: database connection, outside a transaction.
+        :param version: version number of the migration.
+        :param name: short description of the migration.
+        :param func: the migration function.
+        """
+        sqlite = connection.dialect.name == 'sqlite'
+        if sqlite:
+            # can only be changed outside a transaction.
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+
+        try:
+            with connection.begin():
+                func(connection, inspect(connection), self)
+                if sqlite:
+                    violations = connection.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+                    if violations:
+                        raise MigrationError(f"Migration {version} would break foreign keys: {violations[:10]}")
+                connection.execute(insert(schema_version).values(version=version, name=name))
+        finally:
+            if sqlite:
+                connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+                connection.commit()
+
+    def explain(self, connection, query):
+        """
+        Get the query plan of a query.
+        :param connection: database connection.
+        :param query: the select statement to explain.
+        Returns:
+            (list) rows of the query plan as dicts.
+        """
+        sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+        prefix = 'EXPLAIN QUERY PLAN' if connection.dialect.name == 'sqlite' else 'EXPLAIN'
+        return [dict(row._mapping) for row in connection.execute(text(f"{prefix} {sql}"))]
+
+    def is_full_scan(self, dialect, plan) -> bool:
+        """
+        Check if a query plan reads every row of a table.
+        :param dialect: name of the database dialect.
+        :param plan: rows returned by explain.
+        Returns:
+            (bool) if the query scans a whole table.
+        """
+        if dialect == 'sqlite':
+            # e.g. 'SCAN user' rather than 'SEARCH user USING INDEX uq_user_snowflake (snowflake=?)'
+            return any(str(row.get('detail', '')).startswith('SCAN') for row in plan)
+        return any(str(row.get('type', '')).upper() in ('ALL', 'INDEX') for row in plan)
+
+    def check_query_plans(self):
+        """
+        Explain each hot query, to check none of them fall back to a full table scan.
+        Returns:
+            (dict) name of each query that scans a full table and its query plan.
+        """
+        failures = {}
+        with self.engine.connect() as connection:
+            dialect = connection.dialect.name
+            if dialect not in ('mysql', 'sqlite'):
+                raise MigrationError(f"Query plans can't be checked on {dialect} databases.")
+
+            for name, query in HOT_QUERIES.items():
+                plan = self.explain(connection, query)
+                if self.is_full_scan(dialect, plan):
+                    failures[name] = plan
+
+        return failures
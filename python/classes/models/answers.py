@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
 from python.classes.database import database
 
 class Answers(database.Model):
     id = Column(Integer, primary_key=True)
+    event_id = Column(Integer, ForeignKey('event.id', name='fk_answers_event'), nullable=False)
     user_snowflake = Column(String(255))
     fav_game = Column(Text)
     fav_colour = Column(Text)
@@ -11,8 +12,13 @@ class Answers(database.Model):
     fav_food = Column(Text)
     hobby_interest = Column(Text)
 
+    __table_args__ = (
+        Index('uq_answers_event_user_snowflake', 'event_id', 'user_snowflake', unique=True),
+    )
+
     def __init__(self, user_snowflake, fav_game, fav_colour, fav_song,
-                fav_film, fav_food, hobby_interest):
+                fav_film, fav_food, hobby_interest, event_id=None):
+        self.event_id = event_id
         self.user_snowflake = user_snowflake
         self.fav_game = fav_game
         self.fav_colour = fav_colour
@@ -0,0 +1,35 @@
+from sqlalchemy import Table, Column, Integer, Index
+from python.classes.database import database
+from python.classes.models.user import User
+from python.classes.models.answers import Answers
+from python.classes.models.artwork import Artwork
+from python.classes.models.ban_list import BanList
+
+def archive_table(table, *indexed):
+    """
+    Create a table to archive the rows of finished events into, with the same columns as the table but
+    none of its constraints, so rows can be copied across in one INSERT ... SELECT.
+    :param table: the model's Table.
+    :param indexed: (optional) names of other columns archived rows are looked up by.
+    Returns:
+        (Table) the archive table e.g. archived_user.
+    """
+    columns = [Column(column.name, column.type, nullable=True) for column in table.columns]
+    return Table(
+        f"archived_{table.name}",
+        database.metadata,
+        # rows keep their original id, which can be reused by the hot table once rows are deleted from it.
+        Column('archive_id', Integer, primary_key=True),
+        *columns,
+        Index(f"ix_archived_{table.name}_event_id", 'event_id'),
+        *(Index(f"ix_archived_{table.name}_{column}", column) for column in indexed)
+    )
+
+# Archive tables of each per-event table, in the order their rows are archived (rows referencing users first).
+# archived artwork still uses its file, which is looked up by content_hash before the file is removed.
+ARCHIVE_TABLES = {
+    BanList.__table__: archive_table(BanList.__table__),
+    Artwork.__table__: archive_table(Artwork.__table__, 'content_hash'),
+    Answers.__table__: archive_table(Answers.__table__),
+    User.__table__: archive_table(User.__table__),
+}
@@ -1,13 +1,27 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey, ForeignKeyConstraint, Index
 from python.classes.database import database
 from sqlalchemy.sql import func
 
 class Artwork(database.Model):
     id = Column(Integer, primary_key=True)
-    created_by = Column(String(255), ForeignKey('user.snowflake'))
+    event_id = Column(Integer, ForeignKey('event.id', name='fk_artwork_event'), nullable=False)
+    created_by = Column(String(255))
     image_path = Column(String(255))
+    # SHA-256 of the file, which image_path is named after (None for artwork uploaded before files were hashed).
+    content_hash = Column(String(64), nullable=True, default=None)
+    thumbnail_path = Column(String(255), nullable=True, default=None)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
-    def __init__(self, created_by, image_path):
-        self.created_by = created_by,
-        self.image_path = image_path,
+    __table_args__ = (
+        Index('uq_artwork_event_created_by', 'event_id', 'created_by', unique=True),
+        Index('ix_artwork_event_id', 'event_id', 'id'),
+        Index('ix_artwork_content_hash', 'content_hash'),
+        ForeignKeyConstraint(['event_id', 'created_by'], ['user.event_id', 'user.snowflake'],
+                             name='fk_artwork_created_by'),
+    )
+
+    def __init__(self, created_by, image_path, event_id=None, content_hash=None):
+        self.event_id = event_id
+        self.created_by = created_by
+        self.image_path = image_path
+        self.content_hash = content_hash
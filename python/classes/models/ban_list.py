@@ -1,13 +1,29 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, ForeignKeyConstraint, Index
 from python.classes.database import database
 
 class BanList(database.Model):
     id = Column(Integer, primary_key=True)
-    user_snowflake = Column(String(255), ForeignKey('user.snowflake'))
+    event_id = Column(Integer, ForeignKey('event.id', name='fk_ban_list_event'), nullable=False)
+    user_snowflake = Column(String(255))
     reason = Column(Text)
     banned_user = database.relationship('User')
 
-    def __init__(self, user_snowflake, reason, banned_user):
+    __table_args__ = (
+        Index('uq_ban_list_event_user_snowflake', 'event_id', 'user_snowflake', unique=True),
+        ForeignKeyConstraint(['event_id', 'user_snowflake'], ['user.event_id', 'user.snowflake'],
+                             name='fk_ban_list_user'),
+    )
+
+    def __init__(self, user_snowflake, reason, banned_user, event_id=None):
+        self.event_id = event_id
         self.user_snowflake = user_snowflake
         self.reason = reason
-        self.banned_user = banned_user
\ No newline at end of file
+        self.banned_user = banned_user
+class BanVersion(database.Model):
+    """
+    A single row counting changes to the ban_list table, bumped in the same transaction as every ban & unban
+    so workers can tell when their in-memory ban list is stale.
+    """
+    __tablename__ = 'ban_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
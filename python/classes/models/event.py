@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Boolean, Integer, BigInteger, String, TIMESTAMP, UniqueConstraint
+from python.classes.database import database
+from sqlalchemy.sql import func
+
+class Event(database.Model):
+    id = Column(Integer, primary_key=True)
+    slug = Column(String(64), nullable=False)
+    name = Column(String(255))
+    server = Column(BigInteger, nullable=True, default=None)
+    start_time = Column(Integer, nullable=True, default=None)
+    is_started = Column(Boolean, default=False)
+    is_archived = Column(Boolean, default=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('slug', name='uq_event_slug'),
+    )
+
+    def __init__(self, slug, name, server, start_time):
+        self.slug = slug
+        self.name = name
+        self.server = server
+        self.start_time = start_time
+        self.is_started = False
+        self.is_archived = False
+
+    def __str__(self):
+        return f"{self.name} ({self.slug})"
+
+    def to_json(self):
+        return {
+            'slug': self.slug,
+            'name': self.name,
+            'server': str(self.server) if self.server is not None else None,
+            'start_time': self.start_time,
+            'is_started': self.is_started,
+            'is_archived': self.is_archived,
+        }
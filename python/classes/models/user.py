@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Boolean, Integer, String, Index
+from sqlalchemy import Column, Boolean, Integer, String, ForeignKey, ForeignKeyConstraint, UniqueConstraint, Index
 from python.classes.database import database
 
 class User(database.Model):
     id = Column(Integer, primary_key=True)
-    snowflake = Column(String(255), index=True)
+    event_id = Column(Integer, ForeignKey('event.id', name='fk_user_event'), nullable=False)
+    snowflake = Column(String(255))
     avatar_url = Column(String(255))
     username = Column(String(255))
     partner = Column(String(255), nullable=True, default=None)
@@ -11,9 +12,16 @@ class User(database.Model):
     is_admin = Column(Boolean)
     is_banned = Column(Boolean, default=False)
 
-    Index('idx_snowflake', 'snowflake')
+    # a user signs up once per event, and their partner must have signed up to the same event.
+    # declared as a constraint so it is created with the table, before the partner foreign key needs it.
+    __table_args__ = (
+        UniqueConstraint('event_id', 'snowflake', name='uq_user_event_snowflake'),
+        ForeignKeyConstraint(['event_id', 'partner'], ['user.event_id', 'user.snowflake'], name='fk_user_partner'),
+        Index('ix_user_event_id', 'event_id', 'id'),
+    )
 
-    def __init__(self, snowflake, avatar_url, username, in_server, is_admin):
+    def __init__(self, snowflake, avatar_url, username, in_server, is_admin, event_id=None):
+        self.event_id = event_id
         self.snowflake = snowflake
         self.avatar_url = avatar_url
         self.username = username
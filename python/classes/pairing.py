@@ -0,0 +1,169 @@
+import random
+
+# Most positions tried when swapping a participant to fix a forbidden pair, before starting a new attempt.
+MAX_SWAP_TRIES = 200
+# Most participants listed in each part of an infeasibility report.
+REPORT_LIMIT = 20
+
+class PairingError(Exception):
+    """
+    Raised when participants can't be paired without breaking a constraint.
+    :param message: description of why pairing failed.
+    :param report: (dict) details of the participants which couldn't be paired.
+    """
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+class PairingConstraints:
+    """
+    Rules on who can be a participant's partner, each is a list of (snowflake, snowflake) pairs.
+    :param exclusions: pairs who must never be partners, in either direction.
+    :param friends: pairs of friends, who are never partners either so artwork goes outside friend groups.
+    :param previous_partners: (giver, partner) pairs from previous events, a giver won't get the same partner again.
+    """
+    def __init__(self, exclusions=(), friends=(), previous_partners=()):
+        self.exclusions = [(str(a), str(b)) for a, b in exclusions]
+        self.friends = [(str(a), str(b)) for a, b in friends]
+        self.previous_partners = [(str(giver), str(partner)) for giver, partner in previous_partners]
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Create constraints from the 'pairing' property of config.yml.
+        :param settings: mapping with optional 'exclusions', 'friends' & 'previous_partners' lists.
+        Returns:
+            (PairingConstraints) the constraints.
+        """
+        settings = settings or {}
+        return cls(
+            exclusions=settings.get('exclusions') or (),
+            friends=settings.get('friends') or (),
+            previous_partners=settings.get('previous_partners') or ()
+        )
+
+    def forbidden(self, index):
+        """
+        Work out which partners each participant can't have.
+        :param index: dict of each participant's snowflake to their position, constraints on anyone else are ignored.
+        Returns:
+            (dict) position of each constrained participant to the set of positions they can't be paired with.
+        """
+        forbidden = {}
+
+        def forbid(giver, partner):
+            if giver in index and partner in index:
+                forbidden.setdefault(index[giver], set()).add(index[partner])
+
+        for a, b in self.exclusions + self.friends:
+            forbid(a, b)
+            forbid(b, a)
+        for giver, partner in self.previous_partners:
+            forbid(giver, partner)
+        return forbidden
+
+def infeasibility_report(participants, forbidden):
+    """
+    Find participants who can't be given a partner, or can't be anyone's partner, because of the constraints.
+    :param participants: list of snowflakes.
+    :param forbidden: forbidden partners from PairingConstraints.forbidden.
+    Returns:
+        (dict) snowflakes without any possible partner or giver, both lists are empty if there aren't any.
+    """
+    others = len(participants) - 1
+    givers_forbidden = [0] * len(participants)
+    for giver, partners in forbidden.items():
+        for partner in partners:
+            if partner != giver:
+                givers_forbidden[partner] += 1
+
+    no_partner = [participants[giver] for giver, partners in forbidden.items()
+                  if len(partners) - (giver in partners) >= others]
+    no_giver = [participants[partner] for partner, count in enumerate(givers_forbidden) if count >= others]
+
+    return {
+        "participants": len(participants),
+        "no_possible_partner": no_partner[:REPORT_LIMIT],
+        "no_possible_giver": no_giver[:REPORT_LIMIT],
+    }
+
+def pair_participants(participants, constraints=None, seed=None, attempts=10):
+    """
+    Give every participant a partner, forming a single cycle (a -> b -> c -> ... -> a) so nobody is paired
+    with someone who is also paired with them, and no pair breaks the constraints. With exactly 2 participants
+    the cycle is a -> b -> a, so they are each other's partner.
+
+    Participants are shuffled into a cycle and each forbidden pair is fixed by swapping the partner with
+    someone elsewhere in the cycle, where the swap doesn't create a new forbidden pair. With few constraints
+    per participant this is close to linear time, as most swaps succeed on the first try.
+    :param participants: list of snowflakes.
+    :param constraints: (optional) PairingConstraints.
+    :param seed: (optional) seed for the shuffle, the same participants, constraints & seed give the same pairs.
+    :param attempts: times to reshuffle before giving up.
+    Returns:
+        (dict) snowflake of each participant to the snowflake of their partner.
+    Raises:
+        PairingError: if there are fewer than 2 participants, or no pairing satisfying the constraints is found.
+    """
+    participants = [str(snowflake) for snowflake in participants]
+    if not participants:
+        return {}
+    if len(participants) < 2:
+        raise PairingError("At least 2 participants are needed to assign partners.",
+                           {"participants": len(participants), "no_possible_partner": [], "no_possible_giver": []})
+
+    index = {snowflake: position for position, snowflake in enumerate(participants)}
+    if len(index) != len(participants):
+        raise PairingError("Participants must be unique.",
+                           {"participants": len(participants), "no_possible_partner": [], "no_possible_giver": []})
+
+    forbidden = (constraints or PairingConstraints()).forbidden(index)
+    report = infeasibility_report(participants, forbidden)
+    if report["no_possible_partner"] or report["no_possible_giver"]:
+        raise PairingError("Some participants can't be paired with anyone because of the pairing constraints.", report)
+
+    rng = random.Random(seed)
+    size = len(participants)
+    no_constraints = frozenset()
+
+    def allowed(giver, partner):
+        return giver != partner and partner not in forbidden.get(giver, no_constraints)
+
+    unresolved = []
+    for _ in range(attempts):
+        cycle = list(range(size))
+        rng.shuffle(cycle)
+
+        def pair_ok(position):
+            # the participant at position gives to the participant after them.
+            return allowed(cycle[position], cycle[(position + 1) % size])
+
+        unresolved = []
+        for position in range(size):
+            if pair_ok(position):
+                continue
+
+            # swap the partner with someone else, keeping every pair around both places allowed.
+            partner_position = (position + 1) % size
+            for _ in range(MAX_SWAP_TRIES):
+                other = rng.randrange(size)
+                if other == partner_position:
+                    continue
+                affected = {position, partner_position, (other - 1) % size, other}
+                cycle[partner_position], cycle[other] = cycle[other], cycle[partner_position]
+                if all(pair_ok(pair) for pair in affected):
+                    break
+                cycle[partner_position], cycle[other] = cycle[other], cycle[partner_position]
+            else:
+                unresolved.append(participants[cycle[position]])
+                if len(unresolved) >= REPORT_LIMIT:
+                    break
+
+        if not unresolved:
+            return {participants[cycle[position]]: participants[cycle[(position + 1) % size]]
+                    for position in range(size)}
+
+    report["attempts"] = attempts
+    report["unresolved"] = unresolved
+    raise PairingError(f"Couldn't find partners for every participant in {attempts} attempts, "
+                       f"the pairing constraints may be too strict.", report)
@@ -0,0 +1,179 @@
+import threading
+import time
+from sqlalchemy import select, and_
+from sqlalchemy.orm import aliased
+from python.classes.cache import TTLCache
+from python.classes.models.user import User
+from python.classes.models.answers import Answers
+
+class PartnerCards:
+    """
+    Cache the /users/partner response of each user, their partner's details & answers, which only change when
+    the partner edits their answers. Every card in an event is loaded with one query right after users are paired
+    (or on the first reveal in other workers), so reveal-day polling of /users/partner doesn't use the database.
+    """
+    def __init__(self, ttl=300, max_size=10000):
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.engine = None
+        self.lock = threading.Lock()
+        # event id -> {partner snowflake: snowflake of the user whose card shows them}, to invalidate
+        # a card when the partner it shows edits their answers.
+        self.givers = {}
+        # event id -> when every card in the event was last loaded.
+        self.loaded_at = {}
+
+    def configure(self, ttl, max_size):
+        """
+        Update the cache settings, clearing any cached cards.
+        :param ttl: seconds a card is cached for, e.g. before an answer edit made in another worker is seen.
+        :param max_size: maximum amount of cached cards, at most this many cards are loaded for an event.
+        """
+        with self.lock:
+            self.cache = TTLCache(max_size=max_size, ttl=ttl)
+            self.givers.clear()
+            self.loaded_at.clear()
+
+    def init_app(self, engine):
+        """
+        Load cards with their own short-lived connections, like Events.
+        :param engine: the database engine.
+        """
+        self.engine = engine
+
+    @staticmethod
+    def query(event_id):
+        """
+        Create the query of every paired user in an event, their partner & their partner's answers.
+        :param event_id: id of the event.
+        Returns:
+            (Select) query of card rows.
+        """
+        partner = aliased(User)
+        return (
+            select(
+                User.snowflake,
+                partner.snowflake.label('partner_snowflake'),
+                partner.username,
+                partner.avatar_url,
+                Answers.fav_game,
+                Answers.fav_colour,
+                Answers.fav_song,
+                Answers.fav_film,
+                Answers.fav_food,
+                Answers.hobby_interest
+            )
+            .join(partner, and_(partner.event_id == User.event_id, partner.snowflake == User.partner))
+            .outerjoin(Answers, and_(Answers.event_id == User.event_id, Answers.user_snowflake == User.partner))
+            .where(User.event_id == event_id)
+        )
+
+    def add(self, event_id, row) -> dict:
+        """
+        Create a card from a row of query() and cache it.
+        :param event_id: id of the event.
+        :param row: card row.
+        Returns:
+            (dict) the card, in the same format as /users/partner.
+        """
+        card = {
+            "details": {
+                'snowflake': row.partner_snowflake,
+                'username': row.username,
+                'avatar_url': row.avatar_url,
+            },
+            # partners who haven't answered (e.g. imported users) have no answers.
+            "answers": {
+                'game': row.fav_game,
+                'colour': row.fav_colour,
+                'song': row.fav_song,
+                'film': row.fav_film,
+                'food': row.fav_food,
+                'hobby': row.hobby_interest
+            } if row.fav_game is not None else {}
+        }
+        self.givers.setdefault(event_id, {})[row.partner_snowflake] = row.snowflake
+        self.cache.set((event_id, row.snowflake), card)
+        return card
+
+    def build(self, event_id):
+        """
+        Load every card in an event (up to the cache's max size) with a single query, e.g. once users are paired.
+        :param event_id: id of the event.
+        """
+        with self.lock:
+            self.load(event_id)
+
+    def load(self, event_id):
+        """
+        See build, called while holding the lock.
+        """
+        if self.engine is None or not self.cache.enabled:
+            return
+
+        self.clear_event(event_id)
+        with self.engine.connect() as connection:
+            rows = connection.execution_options(yield_per=1000).execute(
+                self.query(event_id).limit(self.cache.max_size)
+            )
+            for row in rows:
+                self.add(event_id, row)
+        self.loaded_at[event_id] = time.monotonic()
+
+    def get(self, event, snowflake):
+        """
+        Get a user's partner card, loading every card in the event on the first miss once it has started. Later misses,
+        e.g. expired cards or cards which didn't fit in the cache, only load the user's own card.
+        :param event: the event (see Events.get).
+        :param snowflake: discord snowflake of the user.
+        Returns:
+            (dict) partner details & answers, or None if the user doesn't have a partner.
+        """
+        snowflake = str(snowflake)
+        key = (event.id, snowflake)
+        card = self.cache.get(key)
+        if card is not None:
+            return card
+
+        # the whole event is only loaded once per worker (e.g. the first reveal in a worker which didn't pair it),
+        # only one thread loads it and requests which missed at the same time use its cards.
+        if event.is_started and event.id not in self.loaded_at:
+            with self.lock:
+                if event.id not in self.loaded_at:
+                    self.load(event.id)
+            card = self.cache.get(key)
+            if card is not None:
+                return card
+
+        # not paired yet, expired, or evicted from a full cache.
+        with self.engine.connect() as connection:
+            row = connection.execute(self.query(event.id).where(User.snowflake == snowflake)).first()
+        return self.add(event.id, row) if row is not None else None
+
+    def invalidate_partner(self, event_id, snowflake):
+        """
+        Remove the card which shows a user, after they have changed their answers.
+        :param event_id: id of the event.
+        :param snowflake: discord snowflake of the partner who changed.
+        """
+        giver = self.givers.get(event_id, {}).get(str(snowflake))
+        if giver is not None:
+            self.cache.invalidate((event_id, giver))
+
+    def clear_event(self, event_id):
+        """
+        Remove every card in an event, e.g. after answers are imported or the event is archived.
+        :param event_id: id of the event.
+        """
+        for giver in self.givers.pop(event_id, {}).values():
+            self.cache.invalidate((event_id, giver))
+        self.loaded_at.pop(event_id, None)
+
+    def stats(self) -> dict:
+        """
+        Get the hit / miss counters of the partner card cache.
+        Returns:
+            (dict) cache counters.
+        """
+        return self.cache.stats()
+
+partner_cards = PartnerCards()
@@ -0,0 +1,133 @@
+import os
+import random
+import string
+import hashlib
+
+from datetime import datetime, timedelta
+from python.classes.artwork_store import ArtworkStore
+
+# Seeded snowflakes are 18 digits like discord's, spread over this range by SNOWFLAKE_STEP.
+SNOWFLAKE_BASE = 10 ** 17
+SNOWFLAKE_RANGE = 9 * 10 ** 17
+# A prime which shares no factors with SNOWFLAKE_RANGE, so every user gets a different snowflake.
+SNOWFLAKE_STEP = 2654435761
+# Seeded artwork is uploaded over the 30 days after this date.
+ARTWORK_EPOCH = datetime(2023, 12, 1)
+# A 1x1 transparent PNG, the placeholder file of all seeded artwork which is stored once by its hash.
+PLACEHOLDER_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d4944415478da63606060600000000500017aa857500000000049454e44ae426082"
+)
+PLACEHOLDER_HASH = hashlib.sha256(PLACEHOLDER_PNG).hexdigest()
+PLACEHOLDER_PATH = ArtworkStore.content_path(PLACEHOLDER_HASH, "png")
+
+ANSWERS = {
+    'fav_game': ["Minecraft", "Stardew Valley", "Celeste", "Hades", "Tetris", "Portal 2", "Outer Wilds"],
+    'fav_colour': ["Red", "Green", "Blue", "Purple", "Orange", "Teal", "Pink", "Yellow"],
+    'fav_song': ["Last Christmas", "Jingle Bell Rock", "Bohemian Rhapsody", "Mr. Brightside", "Dreams"],
+    'fav_film': ["Elf", "Home Alone", "The Grinch", "Paddington 2", "Spirited Away", "Arthur Christmas"],
+    'fav_food': ["Pizza", "Roast dinner", "Sushi", "Mince pies", "Curry", "Pancakes"],
+    'hobby_interest': ["Drawing", "Knitting", "Gaming", "Baking", "Hiking", "Music", "Reading"],
+}
+
+class SeedData:
+    """
+    Deterministic synthetic users for an event, with answers, bans, partners & artwork which are consistent
+    with each other the same way real sign-ups are: every user has answers, banned users are in the ban list
+    & have no partner, and only users with a partner can have uploaded artwork. The same seed & arguments
+    always generate the same rows.
+    """
+    def __init__(self, amount, event_id, seed=0, paired=True, ban_rate=0.01, artwork_rate=0.5):
+        """
+        :param amount: amount of users to generate.
+        :param event_id: id of the event the users signed up to.
+        :param seed: seed of the random generator.
+        :param paired: if users are given partners, as if the event had started.
+        :param ban_rate: fraction of users who are banned (0 - 1).
+        :param artwork_rate: fraction of users with a partner who have uploaded artwork (0 - 1).
+        """
+        self.amount = amount
+        self.event_id = event_id
+        self.paired = paired
+        self.ban_rate = ban_rate
+        self.artwork_rate = artwork_rate if paired else 0
+        self.rng = random.Random(seed)
+        self.snowflake_offset = self.rng.randrange(SNOWFLAKE_RANGE)
+
+        # each paired user's partner is the paired user generated before them, so their partner is always
+        # inserted first. the first paired user's partner is the last one, which closes the cycle.
+        self.first_paired = None
+        self.last_paired = None
+
+    def snowflake(self, index) -> str:
+        """
+        :param index: position of the user.
+        Returns:
+            (str) unique 18 digit snowflake of the user.
+        """
+        return str(SNOWFLAKE_BASE + (index * SNOWFLAKE_STEP + self.snowflake_offset) % SNOWFLAKE_RANGE)
+
+    def chunks(self, chunk_size=10000):
+        """
+        Generate every user in chunks, with the rows of each table which belong to them.
+        :param chunk_size: amount of users in each chunk.
+        Returns:
+            (generator) dicts of table name to a list of row dicts, in the order they must be inserted.
+        """
+        rng = self.rng
+        letters = string.ascii_letters
+        answer_choices = list(ANSWERS.items())
+
+        for start in range(0, self.amount, chunk_size):
+            users, answers, bans, artwork = [], [], [], []
+
+            for index in range(start, min(start + chunk_size, self.amount)):
+                snowflake = self.snowflake(index)
+                username = ''.join(rng.choices(letters, k=rng.randint(5, 10)))
+                is_banned = rng.random() < self.ban_rate
+                partner = None
+
+                if self.paired and not is_banned:
+                    partner = self.last_paired
+                    if self.first_paired is None:
+                        self.first_paired = snowflake
+                    self.last_paired = snowflake
+
+                users.append({
+                    'event_id': self.event_id,
+                    'snowflake': snowflake,
+                    'avatar_url': f"avatar_{username}.jpg",
+                    'username': username,
+                    'partner': partner,
+                    'in_server': True,
+                    'is_admin': False,
+                    'is_banned': is_banned,
+                })
+
+                row = {column: rng.choice(choices) for column, choices in answer_choices}
+                row.update(event_id=self.event_id, user_snowflake=snowflake)
+                answers.append(row)
+
+                if is_banned:
+                    bans.append({'event_id': self.event_id, 'user_snowflake': snowflake,
+                                 'reason': "Seeded ban."})
+                elif self.paired and rng.random() < self.artwork_rate:
+                    artwork.append({
+                        'event_id': self.event_id,
+                        'created_by': snowflake,
+                        'image_path': PLACEHOLDER_PATH,
+                        'content_hash': PLACEHOLDER_HASH,
+                        'created_at': ARTWORK_EPOCH + timedelta(seconds=rng.randrange(30 * 24 * 3600)),
+                    })
+
+            yield {'user': users, 'answers': answers, 'ban_list': bans, 'artwork': artwork}
+
+def write_placeholder(upload_folder):
+    """
+    Write the placeholder artwork file, so seeded artwork can be viewed & exported.
+    :param upload_folder: path of the upload folder.
+    """
+    file_path = os.path.join(upload_folder, PLACEHOLDER_PATH)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'wb') as file:
+        file.write(PLACEHOLDER_PNG)
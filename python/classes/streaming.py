@@ -0,0 +1,63 @@
+import json
+from flask import Response, stream_with_context
+
+STREAM_FORMATS = {"json", "ndjson"}
+
+def stream_json_array(items):
+    """
+    Serialise an iterable of dicts as a JSON array one item at a time.
+    :param items: iterable of json serialisable objects.
+    Returns:
+        (generator) chunks of the JSON array.
+    """
+    yield "["
+    for index, item in enumerate(items):
+        yield ("," if index else "") + json.dumps(item)
+    yield "]"
+
+def stream_ndjson(items):
+    """
+    Serialise an iterable of dicts as newline delimited JSON, one object per line.
+    :param items: iterable of json serialisable objects.
+    Returns:
+        (generator) lines of JSON.
+    """
+    for item in items:
+        yield json.dumps(item) + "\n"
+
+def stream_response(items, stream_format):
+    """
+    Create a streamed response so large results are sent without building them in memory.
+    :param items: iterable of json serialisable objects, consumed while the response is sent.
+    :param stream_format: 'json' for a JSON array or 'ndjson' for newline delimited JSON.
+    Returns:
+        (Response) streamed flask response.
+    """
+    if stream_format == "ndjson":
+        return Response(stream_with_context(stream_ndjson(items)), mimetype="application/x-ndjson")
+    return Response(stream_with_context(stream_json_array(items)), mimetype="application/json")
+
+def parse_limit(limit, max_limit):
+    """
+    Parse the 'limit' query parameter of a paginated endpoint.
+    :param limit: the parameter as a string, or None if it was not given.
+    :param max_limit: largest allowed page size, also used when no limit is given.
+    Returns:
+        (int) the page size, or None if the limit is not a number between 1 and max_limit.
+    """
+    if limit is None:
+        return max_limit
+    if not limit.isdigit() or not 0 < int(limit) <= max_limit:
+        return None
+    return int(limit)
+
+def parse_bool(value):
+    """
+    Parse a true / false query parameter.
+    :param value: the parameter as a string, or None if it was not given.
+    Returns:
+        (bool) the parsed value, or None if it was not given or isn't true / false.
+    """
+    if value is None:
+        return None
+    return {"true": True, "1": True, "false": False, "0": False}.get(value.lower())
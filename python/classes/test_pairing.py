@@ -0,0 +1,132 @@
+"""
+Checks of the pairing engine's constraints, swap repair & infeasibility report.
+
+Usage (from the repository root):
+    python -m unittest python.classes.test_pairing
+"""
+import unittest
+
+from python.classes.pairing import PairingConstraints, PairingError, pair_participants
+
+def participants(amount):
+    """
+    :param amount: amount of participants.
+    Returns:
+        (list) snowflakes of the participants.
+    """
+    return [str(10 ** 17 + number) for number in range(amount)]
+
+class PairParticipantsTest(unittest.TestCase):
+    def assert_single_cycle(self, people, partners):
+        """
+        Check every participant gives to exactly one other participant & receives from exactly one, in one cycle.
+        """
+        self.assertEqual(set(partners), set(people))
+        self.assertEqual(sorted(partners.values()), sorted(people))
+        for giver, partner in partners.items():
+            self.assertNotEqual(giver, partner)
+
+        visited, current = set(), people[0]
+        while current not in visited:
+            visited.add(current)
+            current = partners[current]
+        self.assertEqual(visited, set(people))
+
+    def test_nobody_is_paired_with_themselves(self):
+        for amount in (2, 3, 10, 500):
+            people = participants(amount)
+            self.assert_single_cycle(people, pair_participants(people, seed=amount))
+
+    def test_nobody_is_paired_with_their_partner_with_more_than_2_participants(self):
+        people = participants(50)
+        partners = pair_participants(people, seed=1)
+        for giver, partner in partners.items():
+            self.assertNotEqual(partners[partner], giver)
+
+    def test_2_participants_are_each_others_partner(self):
+        a, b = participants(2)
+        self.assertEqual(pair_participants([a, b], seed=1), {a: b, b: a})
+
+    def test_constraints_are_respected(self):
+        people = participants(40)
+        exclusions = [(people[i], people[i + 1]) for i in range(0, 40, 2)]
+        friends = [(people[i], people[i + 2]) for i in range(0, 38, 3)]
+        previous = [(people[i], people[(i + 5) % 40]) for i in range(40)]
+        constraints = PairingConstraints(exclusions=exclusions, friends=friends, previous_partners=previous)
+
+        for seed in range(20):
+            partners = pair_participants(people, constraints, seed=seed)
+            self.assert_single_cycle(people, partners)
+            for a, b in exclusions + friends:
+                self.assertNotEqual(partners[a], b)
+                self.assertNotEqual(partners[b], a)
+            for giver, partner in previous:
+                self.assertNotEqual(partners[giver], partner)
+
+    def test_previous_partners_only_apply_to_the_giver(self):
+        a, b, c = participants(3)
+        # a can't give to b again, so the only cycle left is a -> c -> b -> a.
+        partners = pair_participants([a, b, c], PairingConstraints(previous_partners=[(a, b)]), seed=0)
+        self.assertEqual(partners, {a: c, c: b, b: a})
+
+    def test_snowflakes_are_compared_as_strings(self):
+        a, b, c, d = participants(4)
+        constraints = PairingConstraints(exclusions=[(int(a), int(b))])
+        partners = pair_participants([int(a), int(b), int(c), int(d)], constraints, seed=0)
+        self.assertNotEqual(partners[a], b)
+        self.assertNotEqual(partners[b], a)
+
+    def test_the_same_seed_gives_the_same_pairs(self):
+        people = participants(200)
+        constraints = PairingConstraints(exclusions=[(people[i], people[i + 1]) for i in range(0, 200, 2)])
+        first = pair_participants(people, constraints, seed=42)
+        self.assertEqual(first, pair_participants(people, constraints, seed=42))
+        self.assertNotEqual(first, pair_participants(people, constraints, seed=43))
+
+    def test_no_participants_gives_no_pairs(self):
+        self.assertEqual(pair_participants([]), {})
+
+class PairingErrorTest(unittest.TestCase):
+    def test_a_single_participant_can_not_be_paired(self):
+        with self.assertRaises(PairingError):
+            pair_participants(participants(1))
+
+    def test_duplicate_participants_are_rejected(self):
+        a, b = participants(2)
+        with self.assertRaises(PairingError):
+            pair_participants([a, b, a])
+
+    def test_participant_excluded_from_everyone_is_reported(self):
+        people = participants(5)
+        loner = people[0]
+        constraints = PairingConstraints(exclusions=[(loner, other) for other in people[1:]])
+
+        with self.assertRaises(PairingError) as context:
+            pair_participants(people, constraints, seed=0)
+        report = context.exception.report
+        self.assertEqual(report["participants"], 5)
+        self.assertIn(loner, report["no_possible_partner"])
+        self.assertIn(loner, report["no_possible_giver"])
+
+    def test_participant_nobody_can_give_to_is_reported(self):
+        people = participants(4)
+        target = people[0]
+        constraints = PairingConstraints(previous_partners=[(other, target) for other in people[1:]])
+
+        with self.assertRaises(PairingError) as context:
+            pair_participants(people, constraints, seed=0)
+        self.assertEqual(context.exception.report["no_possible_partner"], [])
+        self.assertEqual(context.exception.report["no_possible_giver"], [target])
+
+    def test_unsatisfiable_cycle_gives_up_after_every_attempt(self):
+        # everyone has possible partners, but a, b & c can only give to d, who can't receive from all of them.
+        a, b, c, d = participants(4)
+        constraints = PairingConstraints(previous_partners=[(a, b), (a, c), (b, a), (b, c), (c, a), (c, b)])
+
+        with self.assertRaises(PairingError) as context:
+            pair_participants([a, b, c, d], constraints, seed=0, attempts=3)
+        self.assertEqual(context.exception.report["attempts"], 3)
+        self.assertTrue(context.exception.report["unresolved"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from python.classes.logging import Logging
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Formats thumbnails can be generated for, gif & mp4 thumbnails use their first frame as a poster.
+IMAGE_FORMATS = {"png", "jpg", "jpeg", "gif"}
+VIDEO_FORMATS = {"mp4"}
+# Folder inside the upload folder where thumbnails are saved.
+THUMBNAIL_FOLDER = "thumbnails"
+
+logger = Logging()
+
+def thumbnail_filename(filename) -> str:
+    """
+    Get the path of an artwork's thumbnail, relative to the upload folder. The artwork's extension is kept in the
+    name, so files with the same hash but a different extension don't share a thumbnail.
+    :param filename: filename of the artwork.
+    Returns:
+        (str) path of the thumbnail e.g. thumbnails/artwork/9f/9f86d081884c7d65....png.jpg
+    """
+    return os.path.join(THUMBNAIL_FOLDER, f"{filename}.jpg")
+
+def generate_thumbnail(source_path, thumbnail_path, size):
+    """
+    Generate a JPEG thumbnail for an image, gif or video. This runs in a worker process.
+    :param source_path: path of the uploaded artwork.
+    :param thumbnail_path: path to save the thumbnail to.
+    :param size: (width, height) the thumbnail must fit inside.
+    Returns:
+        (bool) if a thumbnail was generated.
+    """
+    extension = os.path.splitext(source_path)[1].lstrip(".").lower()
+    os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+
+    if extension in IMAGE_FORMATS and Image is not None:
+        with Image.open(source_path) as image:
+            # the first frame of a gif is used as its poster.
+            image.seek(0)
+            thumbnail = image.convert("RGB")
+            thumbnail.thumbnail(size)
+            thumbnail.save(thumbnail_path, "JPEG", quality=80, optimize=True)
+        return True
+
+    if extension in VIDEO_FORMATS and shutil.which("ffmpeg"):
+        result = subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-y", "-i", source_path, "-frames:v", "1",
+             "-vf", f"scale={size[0]}:{size[1]}:force_original_aspect_ratio=decrease", thumbnail_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=60
+        )
+        return result.returncode == 0 and os.path.exists(thumbnail_path)
+
+    return False
+
+class Thumbnails:
+    """
+    Generate artwork thumbnails in a process pool, off the request thread, and record them on the artwork entry.
+    """
+    def __init__(self, workers=2, size=(320, 320)):
+        self.workers = workers
+        self.size = tuple(size)
+        self.executor = None
+
+    def configure(self, workers, size):
+        """
+        Update the amount of worker processes & thumbnail size.
+        :param workers: amount of processes generating thumbnails, 0 disables thumbnails.
+        :param size: (width, height) thumbnails must fit inside.
+        """
+        self.workers = workers
+        self.size = tuple(size)
+
+    def after_fork(self):
+        """
+        Forget the parent process's pool, a forked worker starts its own on first use.
+        """
+        self.executor = None
+
+    def get_executor(self):
+        """
+        Returns:
+            (ProcessPoolExecutor) the process pool, started on first use.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def submit(self, database, upload_folder, artwork_id, filename):
+        """
+        Queue a thumbnail to be generated for newly saved artwork.
+        :param database: Database used to record the thumbnail.
+        :param upload_folder: folder the artwork was saved to.
+        :param artwork_id: id of the artwork entry.
+        :param filename: filename of the saved artwork.
+        """
+        extension = os.path.splitext(filename)[1].lstrip(".").lower()
+        if self.workers <= 0 or extension not in IMAGE_FORMATS | VIDEO_FORMATS:
+            return
+
+        thumbnail_path = thumbnail_filename(filename)
+        # artwork is stored by its hash, so the same file uploaded by someone else already has a thumbnail.
+        if os.path.exists(os.path.join(upload_folder, thumbnail_path)):
+            database.set_artwork_thumbnail(artwork_id, filename, thumbnail_path)
+            return
+
+        future = self.get_executor().submit(
+            generate_thumbnail,
+            os.path.join(upload_folder, filename),
+            os.path.join(upload_folder, thumbnail_path),
+            self.size
+        )
+        future.add_done_callback(
+            lambda done: self.record(done, database, upload_folder, artwork_id, filename, thumbnail_path)
+        )
+
+    @staticmethod
+    def record(future, database, upload_folder, artwork_id, filename, thumbnail_path):
+        """
+        Save the thumbnail of finished work to the artwork entry, removing it if the artwork has since been replaced
+        and no other artwork uses the same file.
+        :param future: the finished thumbnail job.
+        :param database: Database used to record the thumbnail.
+        :param upload_folder: folder the artwork was saved to.
+        :param artwork_id: id of the artwork entry.
+        :param filename: filename the thumbnail was generated from.
+        :param thumbnail_path: path of the thumbnail, relative to the upload folder.
+        """
+        try:
+            # artwork with the same file can still use the thumbnail, unless the file has been removed.
+            if (future.result() and not database.set_artwork_thumbnail(artwork_id, filename, thumbnail_path)
+                    and not os.path.exists(os.path.join(upload_folder, filename))):
+                os.remove(os.path.join(upload_folder, thumbnail_path))
+        except Exception as error:
+            logger.queue_message(f"Could not create a thumbnail for {filename}: {error}", 'ERROR')
+
+thumbnails = Thumbnails()
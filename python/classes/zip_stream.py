@@ -0,0 +1,68 @@
+import zipfile
+
+# Size of each chunk read from files added to the archive (default 1MB)
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+class ZipStreamBuffer:
+    """
+    A write-only, non-seekable file for zipfile to write into, its contents are taken after each write
+    and sent to the client so the archive is never held in memory or written to disk.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def take(self):
+        """
+        Returns:
+            (bytes) everything written since the last call.
+        """
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_zip(files):
+    """
+    Generate a ZIP archive on the fly. Files are stored without compression, as artwork is mostly already
+    compressed media, and are read in chunks so memory use doesn't depend on file or archive size.
+    :param files: iterable of (name in archive, path on disk) tuples.
+    Returns:
+        (generator) chunks of the ZIP archive.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for archive_name, file_path in files:
+            info = zipfile.ZipInfo.from_file(file_path, archive_name)
+            info.compress_type = zipfile.ZIP_STORED
+
+            with open(file_path, "rb") as source, archive.open(info, mode="w") as destination:
+                while chunk := source.read(ZIP_CHUNK_SIZE):
+                    destination.write(chunk)
+                    yield buffer.take()
+            yield buffer.take()
+
+    # the central directory is written when the archive is closed.
+    yield buffer.take()
+
+def archive_name(*parts, extension) -> str:
+    """
+    Join parts of a filename together, removing characters which aren't safe in a ZIP entry name.
+    :param parts: parts of the filename e.g. a username & snowflake.
+    :param extension: file extension including the '.' e.g. '.png'.
+    Returns:
+        (str) filename for the archive.
+    """
+    safe_parts = ["".join(char for char in str(part) if char.isalnum() or char in "-.")
+                  for part in parts if part is not None]
+    return "_".join(part for part in safe_parts if part) + extension
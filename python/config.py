@@ -1,27 +1,115 @@
+import os
+import threading
 import yaml
 import time
 
+from types import MappingProxyType
 from functools import wraps
-from flask_discord import DiscordOAuth2Session
 from flask import request, jsonify
+from python.classes.identity import identity
+from python.classes.ban_index import ban_index
+from python.classes.events import events
 from python.classes.models.user import User
-from python.classes.models.ban_list import BanList
 from python.classes.models.answers import Answers
 
+# Environment variables which override values in the 'database' property of config.yml.
+DATABASE_ENVIRONMENT = {
+    'uri': 'SB_DATABASE_URI',
+    'pool_size': 'SB_DB_POOL_SIZE',
+    'max_overflow': 'SB_DB_MAX_OVERFLOW',
+    'pool_timeout': 'SB_DB_POOL_TIMEOUT',
+    'pool_pre_ping': 'SB_DB_POOL_PRE_PING',
+    'pool_recycle': 'SB_DB_POOL_RECYCLE',
+    'statement_timeout': 'SB_DB_STATEMENT_TIMEOUT',
+}
+
+def freeze(value):
+    """
+    Recursively convert parsed yaml into read-only mappings and tuples.
+    :param value: parsed yaml value.
+    Returns:
+        (any) an immutable copy of the value.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class ConfigSnapshot:
+    """
+    An immutable parsed copy of config.yml, with lookups used on every request worked out once.
+    """
+    __slots__ = ('raw', 'settings', 'discord', 'admins', 'reload_interval', 'mtime')
+
+    def __init__(self, raw, mtime):
+        self.raw = raw
+        self.settings = freeze(raw)
+        self.discord = self.settings.get('discord') or MappingProxyType({})
+        self.admins = frozenset((self.discord.get('admins') or {}).values())
+        self.reload_interval = (self.settings.get('cache') or {}).get('config_reload_interval', 2)
+        self.mtime = mtime
+
 class Config:
     def __init__(self, file_path, logger):
         self.file_path = file_path
         self.logger = logger
+        self.lock = threading.RLock()
+
+        self.snapshot = self.load_snapshot()
+        self.checked_at = time.monotonic()
+
+    @property
+    def config(self):
+        """
+        Returns:
+            (MappingProxyType) read-only view of the current config.yml.
+        """
+        return self.current().settings
 
+    def file_mtime(self):
+        """
+        Returns:
+            (tuple) modification time & size of config.yml, used to notice when it has been edited.
+        """
+        stat = os.stat(self.file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load_snapshot(self):
+        """
+        Read and parse config.yml.
+        Returns:
+            (ConfigSnapshot) snapshot of the file's current contents.
+        """
+        mtime = self.file_mtime()
         with open(self.file_path, 'r') as file:
-            self.config = yaml.safe_load(file)
+            return ConfigSnapshot(yaml.safe_load(file) or {}, mtime)
 
-    def save_config(self):
+    def current(self):
         """
-        Write changes & make updates to the config file.
+        Get the current config snapshot, reloading config.yml if it has changed on disk. The file is
+        checked at most once every config_reload_interval seconds, so this is cheap to call on every request.
+        Returns:
+            (ConfigSnapshot) the current config snapshot.
         """
-        with open(self.file_path, 'w') as file:
-            yaml.dump(self.config, file)
+        snapshot = self.snapshot
+        now = time.monotonic()
+        if now - self.checked_at < snapshot.reload_interval:
+            return snapshot
+
+        self.checked_at = now
+        try:
+            if self.file_mtime() == snapshot.mtime:
+                return snapshot
+
+            with self.lock:
+                self.snapshot = self.load_snapshot()
+            self.logger.queue_message(f"Reloaded {self.file_path} after it was changed.", 'INFO')
+        except (OSError, yaml.YAMLError) as error:
+            self.logger.queue_message(f"Could not reload {self.file_path}, keeping the previous config: {error}",
+                                      'ERROR')
+
+        return self.snapshot
 
     def find_value(self, key):
         """
@@ -31,42 +119,67 @@ class Config:
         Returns:
             (any) the value of the specified key.
         """
-        return self.config.get('discord', {}).get(key, None)
+        return self.current().discord.get(key, None)
 
-    def update_value(self, key, new_value):
+    def find_setting(self, section, key, default=None):
         """
-        Update a value under the 'discord' property of config.yml.
-        :param key: of the value to be updated.
-        :param new_value: value to replace the one specified in the config.
+        Find a value in any top level property of config.yml (e.g. 'cache') and return it.
+        :param section: name of the top level property.
+        :param key: Key of the value to be returned.
+        :param default: value returned if the section or key does not exist.
+
+        Returns:
+            (any) the value of the specified key, or the default.
         """
-        self.config['discord'][key] = new_value
-        self.save_config()
+        return (self.current().settings.get(section) or {}).get(key, default)
 
-    def get_admins(self):
+    def secret_key(self):
         """
-        Get all admins from the discord property of config.yml
+        Get the key flask signs sessions with, from SB_SECRET_KEY or 'secret_key' under 'security' in config.yml.
+        Every worker process must use the same key, or users are logged out when they reach another worker.
         Returns:
-            (list) All admins in config.yml
+            (str) the secret key, or None if it isn't set.
         """
-        return list(self.config.get('discord', {}).get('admins', {}).values())
+        return os.getenv('SB_SECRET_KEY') or self.find_setting('security', 'secret_key')
 
-    def get_countdown(self):
+    def database_settings(self):
         """
-        Gets a Days, Hours, Minutes, Seconds countdown from the skrapbuk event start time in config.yml.
+        Get the database uri and connection pool settings from the 'database' property of config.yml,
+        where any set environment variables (e.g. SB_DATABASE_URI) take priority.
         Returns:
-            (str) Formatted string of the countdown until the event starts.
+            (dict) database settings.
         """
-        current_time = int(time.time())
-        time_difference = max(self.find_value('start_time') - current_time, 0)
+        settings = dict(self.current().settings.get('database') or {})
+        for key, variable in DATABASE_ENVIRONMENT.items():
+            value = os.getenv(variable)
+            if value is not None:
+                # parse numbers & booleans the same way as config.yml.
+                settings[key] = value if key == 'uri' else yaml.safe_load(value)
+        return settings
 
-        days = time_difference // (24 * 3600)
-        time_difference %= (24 * 3600)
-        hours = time_difference // 3600
-        time_difference %= 3600
-        minutes = time_difference // 60
-        seconds = time_difference % 60
+    def get_admins(self):
+        """
+        Get all admins from the discord property of config.yml
+        Returns:
+            (frozenset) All admin snowflakes in config.yml
+        """
+        return self.current().admins
 
-        return f"{days} days, {hours} hours, {minutes} minutes, {seconds} seconds"
+    def default_event(self):
+        """
+        Get the details of the default event, which is created from the 'discord' property of config.yml
+        when the database is first migrated. Other events are created with /event/create.
+        Returns:
+            (dict) slug, name, server, start_time & is_started of the default event.
+        """
+        slug = self.find_setting('events', 'default', 'default')
+        return {
+            'slug': slug,
+            'name': self.find_setting('events', 'default_name', slug),
+            'server': self.find_value('server'),
+            'start_time': self.find_value('start_time'),
+            'is_started': bool(self.find_value('is_started')),
+        }
 
     def is_admin(self, func):
         """
@@ -77,12 +190,12 @@ class Config:
         """
         @wraps(func)
         def wrapper(*args, **kwargs):
-            discord = DiscordOAuth2Session()
-            if discord.fetch_user().id in self.get_admins():
+            user = identity.fetch_user()
+            if user.id in self.get_admins():
                 return func(*args, **kwargs)
             else:
                 self.logger.queue_message(
-                    message=f"{discord.fetch_user().username} ({discord.fetch_user().id}) can't view /{request.endpoint}, "
+                    message=f"{user.username} ({user.id}) can't view /{request.endpoint}, "
                             f"only admins can access this function.",
                     message_type="INFO"
                 )
@@ -100,14 +213,13 @@ class Config:
         """
         @wraps(func)
         def wrapper(*args, **kwargs):
-            discord = DiscordOAuth2Session()
-            banned_user = BanList.query.filter_by(user_snowflake=discord.fetch_user().id).first()
+            user = identity.fetch_user()
 
-            if not banned_user:
+            if not ban_index.is_banned(user.id, events.current().id):
                return func(*args, **kwargs)
             else:
                 self.logger.queue_message(
-                    message=f"{discord.fetch_user().username} ({discord.fetch_user().id}) can't view /{request.endpoint}, "
+                    message=f"{user.username} ({user.id}) can't view /{request.endpoint}, "
                             f"because they are banned.",
                     message_type="INFO"
                 )
@@ -125,20 +237,19 @@ class Config:
         """
         @wraps(func)
         def wrapper(*args, **kwargs):
-            discord = DiscordOAuth2Session()
-            snowflake = discord.fetch_user().id
-            user = User.query.filter_by(snowflake=snowflake).first()
+            discord_user = identity.fetch_user()
+            user = User.query.filter_by(event_id=events.current().id, snowflake=discord_user.id).first()
 
             # check if the user exists and has a partner
             if user and user.partner:
                  return func(*args, **kwargs)
             else:
                 self.logger.queue_message(
-                    message=f"{discord.fetch_user().username} ({discord.fetch_user().id}) does not have a partner",
+                    message=f"{discord_user.username} ({discord_user.id}) does not have a partner",
                     message_type="INFO"
                 )
 
-                return jsonify({ "error" : f"Woah {discord.fetch_user().username}, its not time to see who your recipient is." }), 400
+                return jsonify({ "error" : f"Woah {discord_user.username}, its not time to see who your recipient is." }), 400
 
         return wrapper
 
@@ -151,17 +262,17 @@ class Config:
         """
         @wraps(func)
         def wrapper(*args, **kwargs):
-            discord = DiscordOAuth2Session()
-            snowflake = discord.fetch_user().id
-            username = discord.fetch_user().username
-            user_answers = Answers.query.filter_by(user_snowflake=snowflake).first()
+            user = identity.fetch_user()
+            snowflake = user.id
+            username = user.username
+            user_answers = Answers.query.filter_by(event_id=events.current().id, user_snowflake=snowflake).first()
 
             # check if user answers exist.
             if user_answers:
                 return func(*args, **kwargs)
             else:
                 self.logger.queue_message(
-                    message=f"{discord.fetch_user().username} ({discord.fetch_user().id}) has not answered questions.",
+                    message=f"{username} ({snowflake}) has not answered questions.",
                     message_type="INFO"
                 )
 
@@ -0,0 +1,34 @@
+"""
+Asynchronous deployment mode, serving the app with gevent. Each request runs in a greenlet instead of a
+worker thread, and waiting on discord, the database or an /event/stream connection yields to other requests,
+so throughput scales with open connections rather than the amount of workers.
+
+Usage (from the repository root):
+    python wsgi.py --host 0.0.0.0 --port 8080
+or with gunicorn, which applies the same patching itself:
+    gunicorn -k gevent --worker-connections 1000 -b 0.0.0.0:8080 wsgi:app
+
+Use a pure python database driver so queries yield too, e.g. mysql+pymysql:// instead of mysql://.
+"""
+from gevent import monkey
+
+# make sockets, locks & sleeps cooperative before anything else imports them.
+monkey.patch_all()
+
+import argparse
+
+from gevent.pywsgi import WSGIServer
+from app import app, logger
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=1000, help="requests handled at once.")
+    args = parser.parse_args()
+
+    logger.queue_message(f"Serving skrapbuk with gevent on {args.host}:{args.port}.", 'INFO')
+    WSGIServer((args.host, args.port), app, spawn=args.connections, log=None).serve_forever()
+
+if __name__ == "__main__":
+    main()